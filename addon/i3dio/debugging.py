@@ -24,6 +24,15 @@ addon_logger.info(f"Initialized logging for {addon_name} addon")
 export_log_file_ending = '_export_log.txt'
 
 
+def update_logger_level():
+    """Sets the level of the addon logger to the lowest level of its handlers. Log calls below that level are then
+    discarded up front, instead of having their message formatted only to be filtered out by every single handler.
+    Handlers left at NOTSET take everything, so they count as DEBUG, since setting the logger itself to NOTSET would make
+    it defer to the level of the root logger instead"""
+    addon_logger.setLevel(min((handler.level or logging.DEBUG for handler in addon_logger.handlers),
+                              default=logging.DEBUG))
+
+
 class ObjectNameAdapter(logging.LoggerAdapter):
     def process(self, msg, kwargs):
         object_name = kwargs.pop('object_name', self.extra['object_name'])
@@ -1,5 +1,6 @@
 from __future__ import annotations  # Enables python 4.0 annotation typehints fx. class self-referencing
 from typing import List
+import os
 import sys
 import time
 import logging
@@ -25,10 +26,13 @@ logger.debug(f"Loading: {__name__}")
 def export_blend_to_i3d(filepath: str, axis_forward, axis_up) -> dict:
 
     export_data = {}
+    # The level of the logger is narrowed to the handlers during the export and restored afterwards, so logging
+    # outside of exports behaves the same as before the first export
+    previous_logger_level = debugging.addon_logger.level
 
     if bpy.context.scene.i3dio.log_to_file:
         # Remove the file ending from path and append log specific naming
-        filename = filepath[0:len(filepath) - len(xml_i3d.file_ending)] + debugging.export_log_file_ending
+        filename = os.path.splitext(filepath)[0] + debugging.export_log_file_ending
         log_file_handler = logging.FileHandler(filename, mode='w')
         log_file_handler.setLevel(logging.DEBUG)
         log_file_handler.setFormatter(debugging.addon_export_log_formatter)
@@ -39,6 +43,7 @@ def export_blend_to_i3d(filepath: str, axis_forward, axis_up) -> dict:
 
     # Output info about the addon
     debugging.addon_console_handler.setLevel(logging.INFO)
+    debugging.update_logger_level()
     logger.info(f"Blender version is: {bpy.app.version_string}")
     logger.info(f"I3D Exporter version is: {sys.modules['i3dio'].__version__}")
     logger.info(f"Exported using '{xml_i3d.xml_current_library}'")
@@ -48,6 +53,7 @@ def export_blend_to_i3d(filepath: str, axis_forward, axis_up) -> dict:
         debugging.addon_console_handler.setLevel(logging.DEBUG)
     else:
         debugging.addon_console_handler.setLevel(debugging.addon_console_handler_default_level)
+    debugging.update_logger_level()
 
     time_start = time.time()
 
@@ -92,6 +98,7 @@ def export_blend_to_i3d(filepath: str, axis_forward, axis_up) -> dict:
 
     debugging.addon_logger.removeHandler(log_file_handler)
     debugging.addon_console_handler.setLevel(debugging.addon_console_handler_default_level)
+    debugging.addon_logger.setLevel(previous_logger_level)
     return export_data
 
 
@@ -138,7 +145,22 @@ def _export(i3d: I3D, objects: List[BlenderObject], sort_alphabetical: bool = Tr
         _add_object_to_i3d(i3d, blender_object)
 
 
-def _add_object_to_i3d(i3d: I3D, obj: BlenderObject, parent: SceneGraphNode = None) -> None:
+def _add_object_to_i3d(i3d: I3D, obj: BlenderObject, parent: SceneGraphNode = None,
+                       instanced_collections: frozenset = frozenset()) -> None:
+    """Adds the object along with everything below it in the hierarchy, depth first. An explicit stack is used instead
+    of recursion, so deep hierarchies can't exceed the recursion limit"""
+    objects_to_add = [(obj, parent, instanced_collections)]
+    while objects_to_add:
+        obj, parent, instanced_collections = objects_to_add.pop()
+        node, children, instanced_collections = _add_single_object_to_i3d(i3d, obj, parent, instanced_collections)
+        # Reversed, so the children are popped in their original order
+        objects_to_add.extend((child, node, instanced_collections) for child in reversed(children))
+
+
+def _add_single_object_to_i3d(i3d: I3D, obj: BlenderObject, parent: SceneGraphNode,
+                              instanced_collections: frozenset) -> (SceneGraphNode, List[BlenderObject], frozenset):
+    """Adds only the object itself and returns its node, the children that should be added to that node and the
+    collections that those children are instanced from"""
     # Special handling of armature nodes, since they are sort of "extra" compared to how other programs like Maya
     # handles bones. So the option for turning them off is provided.
     _parent = parent
@@ -152,81 +174,83 @@ def _add_object_to_i3d(i3d: I3D, obj: BlenderObject, parent: SceneGraphNode = No
     if isinstance(obj, bpy.types.Collection):
         logger.debug(f"[{obj.name}] is a 'Collection'")
         node = i3d.add_transformgroup_node(obj, _parent)
-        _process_collection_objects(i3d, obj, node)
-        return  # Early return because collections are special
+        return node, _collection_children(obj), instanced_collections  # Early return because collections are special
     else:
-        logger.debug(f"[{obj.name}] is of type {obj.type!r}")
-        if obj.type not in i3d.settings['object_types_to_export']:
-            logger.debug(f"[{obj.name}] has type {obj.type!r} which is not a type selected for exporting")
-            return
-        elif obj.type == 'MESH':
-            node = None
-            # Skinned meshes takes precedence over merge groups. They can't co-exist on the same object, for export.
-            if 'SKINNED_MESHES' in i3d.settings['features_to_export'] \
-                    and 'ARMATURE' in i3d.settings['object_types_to_export']:
-                # Armatures need to be exported and skinned meshes enabled to create a skinned mesh node
-                for modifier in obj.modifiers:
-                    # We only need to find one armature to know it should be an armature node
-                    if modifier.type == 'ARMATURE':
-                        node = i3d.add_skinned_mesh_node(obj, _parent)
-                        break
-
-            if node is None:
-                if 'MERGE_GROUPS' in i3d.settings['features_to_export'] and obj.i3d_merge_group.group_id != "":
-                    # Currently the check for a mergegroup relies solely on whether or not a name is set for it
-                    node = i3d.add_merge_group_node(obj, _parent)
-                else:
-                    # Default to a regular shape node
-                    node = i3d.add_shape_node(obj, _parent)
-
-        elif obj.type == 'ARMATURE':
-            node = i3d.add_armature(obj, _parent, is_located=True)
-        elif obj.type == 'EMPTY':
-            node = i3d.add_transformgroup_node(obj, _parent)
-            if obj.instance_collection is not None:
+        obj_type = obj.type
+        logger.debug(f"[{obj.name}] is of type {obj_type!r}")
+        if obj_type not in i3d.settings['object_types_to_export']:
+            logger.debug(f"[{obj.name}] has type {obj_type!r} which is not a type selected for exporting")
+            return None, [], instanced_collections
+
+        try:
+            add_object_node = _object_node_adders[obj_type]
+        except KeyError:
+            raise NotImplementedError(f"Object type: {obj_type!r} is not supported yet") from None
+        node = add_object_node(i3d, obj, _parent)
+
+        if obj_type == 'EMPTY':
+            instance_collection = obj.instance_collection
+            if instance_collection is not None:
+                # A collection that (indirectly) instances itself would otherwise be instanced forever
+                if instance_collection in instanced_collections:
+                    logger.warning(f"[{obj.name}] instances the collection '{instance_collection.name}', which it is "
+                                   f"itself instanced from. The instance is exported as an empty transformgroup")
+                    return node, [], instanced_collections
                 logger.debug(f"[{obj.name}] is a collection instance and will be instanced into the 'Empty' object")
                 # This is a collection instance so the children needs to be fetched from the referenced collection and
                 # be 'instanced' as children of the 'Empty' object directly.
-                _process_collection_objects(i3d, obj.instance_collection, node)
-                return
-        elif obj.type == 'LIGHT':
-            node = i3d.add_light_node(obj, _parent)
-        elif obj.type == 'CAMERA':
-            node = i3d.add_camera_node(obj, _parent)
-        else:
-            raise NotImplementedError(f"Object type: {obj.type!r} is not supported yet")
+                return node, _collection_children(instance_collection), instanced_collections | {instance_collection}
 
         # Process children of objects (other objects) and children of collections (other collections)
-        # WARNING: Might be slow due to searching through the entire object list in the blend file:
-        # https://docs.blender.org/api/current/bpy.types.Object.html#bpy.types.Object.children
         logger.debug(f"[{obj.name}] processing objects children")
-        for child in sort_blender_objects_by_name(obj.children):
-            _add_object_to_i3d(i3d, child, node)
-        logger.debug(f"[{obj.name}] no more children to process in object")
+        return node, i3d.object_children.get(obj, []), instanced_collections
 
 
-def _process_collection_objects(i3d: I3D, collection: bpy.types.Collection, parent: SceneGraphNode):
-    """Handles adding object children of collections. Since collections stores their objects in a list named 'objects'
-    instead of the 'children' list, which only contains child collections. And they need to be iterated slightly
-    different"""
+def _add_mesh_node(i3d: I3D, obj: bpy.types.Object, parent: SceneGraphNode) -> SceneGraphNode:
+    # Skinned meshes takes precedence over merge groups. They can't co-exist on the same object, for export.
+    if 'SKINNED_MESHES' in i3d.settings['features_to_export'] \
+            and 'ARMATURE' in i3d.settings['object_types_to_export']:
+        # Armatures need to be exported and skinned meshes enabled to create a skinned mesh node
+        for modifier in obj.modifiers:
+            # We only need to find one armature to know it should be an armature node
+            if modifier.type == 'ARMATURE':
+                return i3d.add_skinned_mesh_node(obj, parent)
 
-    # Iterate child collections first, since they appear at the top in the blender outliner
-    logger.debug(f"[{collection.name}] processing collections children")
-    for child in collection.children.values():
-        _add_object_to_i3d(i3d, child, parent)
-    logger.debug(f"[{collection.name}] no more children to process in collection")
+    if 'MERGE_GROUPS' in i3d.settings['features_to_export'] and obj.i3d_merge_group.group_id != "":
+        # Currently the check for a mergegroup relies solely on whether or not a name is set for it
+        return i3d.add_merge_group_node(obj, parent)
+    # Default to a regular shape node
+    return i3d.add_shape_node(obj, parent)
 
-    # Then iterate over the objects contained in the collection
-    logger.debug(f"[{collection.name}] processing collection objects")
-    for child in sort_blender_objects_by_name(collection.objects):
-        # If a collection consists of an object, which has it's own children objects. These children will also be a
-        # a part of the collections objects. Which means that they would be added twice without this check. One for the
-        # object itself and one for the collection.
-        if child.parent is None:
-            _add_object_to_i3d(i3d, child, parent)
-    logger.debug(f"[{collection.name}] no more objects to process in collection")
+
+def _add_armature_node(i3d: I3D, obj: bpy.types.Object, parent: SceneGraphNode) -> SceneGraphNode:
+    return i3d.add_armature(obj, parent, is_located=True)
 
 
+# The function adding the node of an object, by the type of the object. Looked up once per object instead of comparing
+# the type against every supported type in turn
+_object_node_adders = {
+    'MESH': _add_mesh_node,
+    'ARMATURE': _add_armature_node,
+    'EMPTY': I3D.add_transformgroup_node,
+    'LIGHT': I3D.add_light_node,
+    'CAMERA': I3D.add_camera_node,
+}
 
 
+def _collection_children(collection: bpy.types.Collection) -> List[BlenderObject]:
+    """Finds the children of collections, in the order they should be exported. Since collections stores their objects
+    in a list named 'objects' instead of the 'children' list, which only contains child collections. And they need to
+    be iterated slightly different"""
 
+    # Child collections go first, since they appear at the top in the blender outliner
+    logger.debug(f"[{collection.name}] processing collections children")
+    children = list(collection.children.values())
+
+    # Then the objects contained in the collection
+    logger.debug(f"[{collection.name}] processing collection objects")
+    # If a collection consists of an object, which has it's own children objects. These children will also be a
+    # a part of the collections objects. Which means that they would be added twice without this check. One for the
+    # object itself and one for the collection.
+    children.extend(child for child in sort_blender_objects_by_name(collection.objects) if child.parent is None)
+    return children
@@ -1,8 +1,11 @@
 """This module contains shared functionality between the different modules of the i3dio addon"""
 from __future__ import annotations  # Enables python 4.0 annotation typehints fx. class self-referencing
-from typing import (Union, Dict, List, Type, OrderedDict, Optional)
+from typing import (Union, Dict, List, Type, OrderedDict, Optional, Iterator)
 import logging
-from . import xml_i3d
+import os
+import itertools
+import numpy as np
+from . import (xml_i3d, utility)
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +16,14 @@ class I3D:
                  depsgraph: bpy.types.Depsgraph):
         self.logger = debugging.ObjectNameAdapter(logging.getLogger(f"{__name__}.{type(self).__name__}"),
                                                   {'object_name': name})
-        self._ids = {
-            'node': 1,
-            'shape': 1,
-            'material': 1,
-            'file': 1,
-        }
+        # Counters handing out the next available id of each kind, they start at 1 since GE ids do
+        self._node_ids = itertools.count(1)
+        self._shape_ids = itertools.count(1)
+        self._material_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
         self.paths = {
             'i3d_file_path': i3d_file_path,
-            'i3d_folder': i3d_file_path[0:i3d_file_path.rfind('\\')],
+            'i3d_folder': os.path.dirname(i3d_file_path),
         }
 
         # Initialize top-level categories
@@ -37,6 +39,9 @@ class I3D:
 
         self.scene_root_nodes = []
         self.conversion_matrix = conversion_matrix
+        # Every node transform is converted with both the matrix and its inverse, so only invert it once
+        self.conversion_matrix_inverted = conversion_matrix.inverted()
+        self.unit_scale = bpy.context.scene.unit_settings.scale_length
 
         self.shapes: Dict[Union[str, int], IndexedTriangleSet] = {}
         self.materials: Dict[Union[str, int], Material] = {}
@@ -46,6 +51,16 @@ class I3D:
 
         self.i3d_mapping: List[SceneGraphNode] = []
 
+        # The transforms of the nodes in the scene, which are decomposed all at once when exporting
+        self.transform_nodes: List[SceneGraphNode] = []
+        self.transform_matrices: List[mathutils.Matrix] = []
+
+        # Buffers for the mesh data, which are reused from mesh to mesh
+        self._scratch_buffers: Dict[str, np.ndarray] = {}
+
+        # The <UserAttribute> element of every node that has user attributes, by node id
+        self.user_attribute_elements: Dict[int, xml_i3d.XML_Element] = {}
+
         # Save all settings for the current run unto the I3D to abstract it from the nodes themselves
         self.settings = {}
         for setting in bpy.context.scene.i3dio.__annotations__.keys():
@@ -53,15 +68,12 @@ class I3D:
 
         self.depsgraph = depsgraph
 
-    # Private Methods ##################################################################################################
-    def _next_available_id(self, id_type: str) -> int:
-        next_id = self._ids[id_type]
-        self._ids[id_type] += 1
-        return next_id
+        self.object_children = utility.map_object_children(bpy.data.objects)
 
+    # Private Methods ##################################################################################################
     def _add_node(self, node_type: Type[SceneGraphNode], object_: Type[bpy.types.bpy_struct],
                   parent: Type[SceneGraphNode] = None) -> SceneGraphNode:
-        node = node_type(self._next_available_id('node'), object_, self, parent)
+        node = node_type(next(self._node_ids), object_, self, parent)
         if parent is None:
             self.scene_root_nodes.append(node)
             self.xml_elements['Scene'].append(node.element)
@@ -114,12 +126,12 @@ class I3D:
             if is_located and not self.settings['collapse_armatures']:
                 skinned_mesh_root_node = self._add_node(SkinnedMeshRootNode, armature_object, parent)
             elif is_located and self.settings['collapse_armatures']:
-                skinned_mesh_root_node = SkinnedMeshRootNode(self._next_available_id('node'), armature_object, self,
+                skinned_mesh_root_node = SkinnedMeshRootNode(next(self._node_ids), armature_object, self,
                                                              None)
                 skinned_mesh_root_node.update_bone_parent(parent)
 
             else:
-                skinned_mesh_root_node = SkinnedMeshRootNode(self._next_available_id('node'), armature_object, self,
+                skinned_mesh_root_node = SkinnedMeshRootNode(next(self._node_ids), armature_object, self,
                                                              None)
 
             skinned_mesh_root_node.is_located = is_located
@@ -154,31 +166,45 @@ class I3D:
         """Add a blender object with a data type of MESH to the scenegraph as a Shape node"""
         return self._add_node(CameraNode, camera_object, parent)
 
-    def add_shape(self, evaluated_mesh: EvaluatedMesh, shape_name: Optional[str] = None, is_merge_group=None,
+    def add_shape(self, mesh_object: bpy.types.Object, shape_name: Optional[str] = None, is_merge_group=None,
                   bone_mapping: ChainMap = None) -> int:
         if shape_name is None:
-            name = evaluated_mesh.name
+            name = mesh_object.data.name
         else:
             name = shape_name
 
+        # The mesh is only evaluated when the shape doesn't exist yet, since evaluating it is by far the most expensive
+        # part of exporting a shape and linked duplicates would otherwise evaluate the same mesh over and over again
         if name not in self.shapes:
-            shape_id = self._next_available_id('shape')
-            indexed_triangle_set = IndexedTriangleSet(shape_id, self, evaluated_mesh, shape_name, is_merge_group,
-                                                      bone_mapping)
+            shape_id = next(self._shape_ids)
+            indexed_triangle_set = IndexedTriangleSet(shape_id, self, EvaluatedMesh(self, mesh_object), shape_name,
+                                                      is_merge_group, bone_mapping)
             # Store a reference to the shape from both it's name and its shape id
             self.shapes.update(dict.fromkeys([shape_id, name], indexed_triangle_set))
-            self.xml_elements['Shapes'].append(indexed_triangle_set.element)
             return shape_id
         return self.shapes[name].id
 
+    def add_transform(self, node: SceneGraphNode, matrix: mathutils.Matrix) -> None:
+        self.transform_nodes.append(node)
+        self.transform_matrices.append(matrix)
+
+    def scratch_buffer(self, name: str, size: int, dtype) -> np.ndarray:
+        """Returns a buffer with room for size elements, which is only valid until the next time the same buffer is
+        requested. It only gets reallocated when a bigger one is needed"""
+        buffer = self._scratch_buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = self._scratch_buffers[name] = np.empty(size, dtype=dtype)
+        return buffer[:size]
+
     def get_shape_by_id(self, shape_id: int):
         return self.shapes[shape_id]
 
     def add_user_attributes(self, user_attributes, node_id):
-        node_attribute_element = self.xml_elements['UserAttributes'].find(f"UserAttribute[@nodeId='{node_id:d}']")
+        node_attribute_element = self.user_attribute_elements.get(node_id)
         if node_attribute_element is None:
             node_attribute_element = xml_i3d.SubElement(self.xml_elements['UserAttributes'], 'UserAttribute',
-                                                   attrib={'nodeId': str(node_id)})
+                                                        attrib={'nodeId': str(node_id)})
+            self.user_attribute_elements[node_id] = node_attribute_element
 
         for attribute in user_attributes:
             attrib = {'name': attribute.name, 'type': attribute.type.replace('data_', '')}
@@ -189,10 +215,9 @@ class I3D:
         name = blender_material.name
         if name not in self.materials:
             self.logger.debug(f"New Material")
-            material_id = self._next_available_id('material')
+            material_id = next(self._material_ids)
             material = Material(material_id, self, blender_material)
             self.materials.update(dict.fromkeys([material_id, name], material))
-            self.xml_elements['Materials'].append(material.element)
             return material_id
         return self.materials[name].id
 
@@ -213,12 +238,11 @@ class I3D:
     def add_file(self, file_type: Type[File], path_to_file: str) -> int:
         if path_to_file not in self.files:
             self.logger.debug(f"New File")
-            file_id = self._next_available_id('file')
+            file_id = next(self._file_ids)
             file = file_type(file_id, self, path_to_file)
             # Store with reference to blender path instead of potential relative path, to avoid unnecessary creation of
             # a file before looking it up in the files dictionary.
             self.files.update(dict.fromkeys([file_id, file.blender_path], file))
-            self.xml_elements['Files'].append(file.element)
             return file_id
         return self.files[path_to_file].id
 
@@ -233,27 +257,60 @@ class I3D:
 
     def get_scene_as_formatted_string(self):
         """Tree represented as depth first"""
-        tree_string = ""
-        longest_string = 0
-
-        def traverse(node, indents=0):
-            nonlocal tree_string, longest_string
-            indent = indents * '  '
-            line = f"|{indent}{node}\n"
-            longest_string = len(line) if len(line) > longest_string else longest_string
-            tree_string += line
-            for child in node.children:
-                traverse(child, indents + 1)
-
-        for root_node in self.scene_root_nodes:
-            traverse(root_node)
-
-        tree_string += f"{longest_string * '-'}\n"
-
-        return f"{longest_string * '-'}\n" + tree_string
+        lines = []
+        # Reversed, so the nodes are popped in their original order
+        nodes_to_visit = [(root_node, 0) for root_node in reversed(self.scene_root_nodes)]
+        while nodes_to_visit:
+            node, indents = nodes_to_visit.pop()
+            lines.append(f"|{indents * '  '}{node}\n")
+            nodes_to_visit.extend((child, indents + 1) for child in reversed(node.children))
+
+        separator = f"{max(map(len, lines), default=0) * '-'}\n"
+        return separator + ''.join(lines) + separator
+
+    def _write_transforms(self) -> None:
+        """Decomposes the transforms of all nodes with numpy in one go, rather than with a handful of mathutils calls
+        for every single node, and writes the components that aren't default"""
+        if not self.transform_nodes:
+            return
+        matrices = np.array(self.transform_matrices, dtype=np.float64).reshape(-1, 4, 4)
+        translations, rotations, scales, is_negative = utility.decompose_transforms(matrices)
+        # Rotation, no unit scaling since it will always be degrees.
+        rotations = np.degrees(rotations)
+
+        def non_default(vectors: np.ndarray, default: float) -> np.ndarray:
+            return ~np.all(np.isclose(vectors, default, rtol=1e-9, atol=0.0000001), axis=1)
+
+        translation_strings = np.where(non_default(translations, 0.0),
+                                       xml_i3d.format_vectors(translations * self.unit_scale, '%.6g'), '')
+        rotation_strings = np.where(non_default(rotations, 0.0), xml_i3d.format_vectors(rotations, '%.6g'), '')
+        scale_strings = np.where(non_default(scales, 1.0), xml_i3d.format_vectors(scales, '%.6g'), '')
+
+        for node, translation, rotation, scale, negative in zip(self.transform_nodes, translation_strings.tolist(),
+                                                                rotation_strings.tolist(), scale_strings.tolist(),
+                                                                is_negative.tolist()):
+            node.write_transform(translation or None, rotation or None, scale or None, negative)
+
+    def _write_shapes(self) -> Iterator[xml_i3d.XML_Element]:
+        """Deduplicates and writes the vertex data of one shape at a time, in shape order. Yields the element of every
+        shape as soon as it is written, which also releases its raw vertex data"""
+        for key, shape in list(self.shapes.items()):
+            if isinstance(key, int):
+                shape.write_vertex_data(deduplicate_vertex_data(columns) for _, columns, _ in shape.vertex_data)
+                yield shape.element
 
     def export_to_i3d_file(self) -> None:
-        xml_i3d.export_to_i3d_file(self.xml_elements['Root'], self.paths['i3d_file_path'])
+        self._write_transforms()
+        if xml_i3d.xml_current_library == 'lxml':
+            # Every shape is written to the file as soon as it is finished, so all of the shapes never have to be held
+            # in memory at the same time
+            xml_i3d.stream_to_i3d_file(self.xml_elements['Root'], self.paths['i3d_file_path'],
+                                       {'Shapes': self._write_shapes()})
+        else:
+            # The whole tree is written in one go, so all shapes have to be finished first
+            for _ in self._write_shapes():
+                pass
+            xml_i3d.export_to_i3d_file(self.xml_elements['Root'], self.paths['i3d_file_path'])
 
         if self.settings['i3d_mapping_file_path'] != '':
             self.export_i3d_mapping()
@@ -271,15 +328,20 @@ class I3D:
                 elif self.settings['i3d_mapping_overwrite_mode'] == 'OVERWRITE':
                     pass
 
+                # The index of every node among its siblings, which is filled in for all children of a parent the
+                # first time one of them is looked up, instead of searching through the siblings for every node
+                root_indexes = {node: index for index, node in enumerate(self.scene_root_nodes)}
+                child_indexes = {}
+
                 def build_index_string(node_to_index):
-                    if node_to_index.parent is None:
-                        index = f"{self.scene_root_nodes.index(node_to_index):d}>"
-                    else:
-                        index = build_index_string(node_to_index.parent)
-                        if index[-1] != '>':
-                            index += '|'
-                        index += str(node_to_index.parent.children.index(node_to_index))
-                    return index
+                    indexes = []
+                    while node_to_index.parent is not None:
+                        if node_to_index not in child_indexes:
+                            child_indexes.update((child, index) for index, child
+                                                 in enumerate(node_to_index.parent.children))
+                        indexes.append(str(child_indexes[node_to_index]))
+                        node_to_index = node_to_index.parent
+                    return f"{root_indexes[node_to_index]:d}>" + '|'.join(reversed(indexes))
 
                 for mapping_node in self.i3d_mapping:
                     if getattr(mapping_node.blender_object.i3d_mapping, 'mapping_name') != '':
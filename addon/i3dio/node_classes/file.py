@@ -18,6 +18,8 @@ class File(Node):
     ELEMENT_TAG = 'File'
     NAME_FIELD_NAME = 'filename'
     ID_FIELD_NAME = 'fileId'
+    __slots__ = ('blender_path', 'resolved_path', 'file_name', 'file_extension', '_xml_element')
+
     @property
     @classmethod
     @abstractmethod
@@ -28,7 +30,7 @@ class File(Node):
         self.blender_path = filepath  # This should be supplied as the normal blender relative path
         self.resolved_path = None
         self.file_name = bpy.path.display_name_from_filepath(self.blender_path)
-        self.file_extension = self.blender_path[self.blender_path.rfind('.'):len(self.blender_path)]
+        self.file_extension = os.path.splitext(self.blender_path)[1]
         self._xml_element = None
         super().__init__(id_, i3d, None)
 
@@ -44,6 +46,10 @@ class File(Node):
     def element(self, value):
         self._xml_element = value
 
+    @property
+    def _parent_element(self):
+        return self.i3d.xml_elements['Files']
+
     # The log gets to scrambled if files are referred by their full path, so just use the filename instead
     def _set_logging_output_name_field(self):
         return debugging.ObjectNameAdapter(logging.getLogger(f"{__name__}.{type(self).__name__}"),
@@ -77,29 +83,34 @@ class File(Node):
         elif file_structure == 'MODHUB':
             self.logger.debug(f"will be copied using the 'MODHUB' hierarchy structure")
             resolved_directory = type(self).MODHUB_FOLDER
-            write_directory += '\\' + resolved_directory
+            write_directory = os.path.join(write_directory, resolved_directory)
         elif file_structure == 'BLENDER':
             self.logger.debug(f"'will be copied using the 'BLENDER' hierarchy structure")
-            # TODO: Rewrite this to make it more than three levels above the blend file but allow deeper nesting
-            #  ,since current code just counts number of slashes
-            blender_relative_distance_limit = 3  # Limits the distance a file can be from the blend file
-            # relative steps to avoid copying entire folder structures ny mistake. Defaults to an absolute path.
-            if self.blender_path.count("..\\") <= blender_relative_distance_limit:
-                # Remove blender relative notation and filename
-                resolved_directory = self.blender_path[2:self.blender_path.rfind('\\')]
-                write_directory += '\\' + resolved_directory
-            else:
-                self.logger.debug(f"'exists more than {blender_relative_distance_limit} folders away "
-                                  f"from .blend file. Defaulting to absolute path and no copying.")
+            # Only paths relative to the blend file ('//') can be mirrored relative to the i3d file. The blender
+            # path may use either separator, so normalize it before using it for the local file system
+            if not self.blender_path.startswith('//'):
+                self.logger.debug(f"is not relative to the .blend file. Defaulting to absolute path and no copying.")
+                self.resolved_path = bpy.path.abspath(self.blender_path)
+                return
+            # Remove blender relative notation and filename
+            resolved_directory = os.path.normpath(os.path.dirname(self.blender_path[2:].replace('\\', '/')))
+            if resolved_directory == os.curdir:
+                resolved_directory = ""
+            write_directory = os.path.normpath(os.path.join(write_directory, resolved_directory))
+            # Never copy anything outside of the export folder
+            if os.path.commonpath([write_directory, self.i3d.paths['i3d_folder']]) \
+                    != os.path.normpath(self.i3d.paths['i3d_folder']):
+                self.logger.warning(f"would be copied outside of the export folder. "
+                                    f"Defaulting to absolute path and no copying.")
                 self.resolved_path = bpy.path.abspath(self.blender_path)
                 return
 
-        self.resolved_path = resolved_directory + '\\' + self.file_name + self.file_extension
+        self.resolved_path = os.path.join(resolved_directory, self.file_name + self.file_extension)
 
         if self.resolved_path != bpy.path.abspath(self.blender_path):  # Check to make sure not to overwrite the file
 
             # We write the file if it either doesn't exists or if it exists, but we are allowed to overwrite.
-            write_path_full = write_directory + '\\' + self.file_name + self.file_extension
+            write_path_full = os.path.join(write_directory, self.file_name + self.file_extension)
             if bpy.context.scene.i3dio.overwrite_files or not os.path.exists(write_path_full):
                 os.makedirs(write_directory, exist_ok=True)
                 try:
@@ -114,7 +125,9 @@ class File(Node):
 
 class Image(File):
     MODHUB_FOLDER = 'textures'
+    __slots__ = ()
 
 
 class Shader(File):
-    MODHUB_FOLDER = 'shaders'
\ No newline at end of file
+    MODHUB_FOLDER = 'shaders'
+    __slots__ = ()
\ No newline at end of file
@@ -14,6 +14,7 @@ class Material(Node):
     ELEMENT_TAG = 'Material'
     NAME_FIELD_NAME = 'name'
     ID_FIELD_NAME = 'materialId'
+    __slots__ = ('blender_material',)
 
     def __init__(self, id_: int, i3d: I3D, blender_material: bpy.types.Material):
         self.blender_material = blender_material
@@ -31,6 +32,10 @@ class Material(Node):
     def element(self, value):
         self.xml_elements['node'] = value
 
+    @property
+    def _parent_element(self):
+        return self.i3d.xml_elements['Materials']
+
     @property
     def tangent(self):
         return self.xml_elements.get('Normalmap', None)
@@ -61,8 +66,7 @@ class Material(Node):
             else:
                 self.logger.debug(f"Has Glossmap '{utility.as_fs_relative_path(gloss_image_path)}'")
                 file_id = self.i3d.add_file_image(gloss_image_path)
-                self.xml_elements['Glossmap'] = xml_i3d.SubElement(self.element, 'Glossmap')
-                self._write_attribute('fileId', file_id, 'Glossmap')
+                self.xml_elements['Glossmap'] = xml_i3d.SubElement(self.element, 'Glossmap', {'fileId': str(file_id)})
         else:
             self.logger.debug(f"Has no Glossmap")
 
@@ -83,8 +87,7 @@ class Material(Node):
             else:
                 self.logger.debug(f"Has Normalmap '{utility.as_fs_relative_path(normal_image_path)}'")
                 file_id = self.i3d.add_file_image(normal_image_path)
-                self.xml_elements['Normalmap'] = xml_i3d.SubElement(self.element, 'Normalmap')
-                self._write_attribute('fileId', file_id, 'Normalmap')
+                self.xml_elements['Normalmap'] = xml_i3d.SubElement(self.element, 'Normalmap', {'fileId': str(file_id)})
         else:
             self.logger.debug(f"Has no Normalmap")
 
@@ -105,8 +108,7 @@ class Material(Node):
                 if diffuse_image_path is not None:
                     self.logger.debug(f"Has diffuse texture '{utility.as_fs_relative_path(diffuse_image_path)}'")
                     file_id = self.i3d.add_file_image(diffuse_image_path)
-                    self.xml_elements['Texture'] = xml_i3d.SubElement(self.element, 'Texture')
-                    self._write_attribute('fileId', file_id, 'Texture')
+                    self.xml_elements['Texture'] = xml_i3d.SubElement(self.element, 'Texture', {'fileId': str(file_id)})
         # Write the diffuse colors
         self._write_diffuse(diffuse)
 
@@ -117,10 +119,12 @@ class Material(Node):
         self.logger.debug(f"Does not use nodes")
 
     def _write_diffuse(self, diffuse_color):
-        self._write_attribute('diffuseColor', "{0:.6f} {1:.6f} {2:.6f} {3:.6f}".format(*diffuse_color))
+        r, g, b, a = diffuse_color
+        self._write_attribute('diffuseColor', f"{r:.6f} {g:.6f} {b:.6f} {a:.6f}")
 
     def _write_specular(self, specular_color):
-        self._write_attribute('specularColor', "{0:.6f} {1:.6f} {2:.6f}".format(*specular_color))
+        x, y, z = specular_color
+        self._write_attribute('specularColor', f"{x:.6f} {y:.6f} {z:.6f}")
 
     def _write_properties(self):
         # Alpha blending
@@ -136,19 +140,15 @@ class Material(Node):
                 self._write_attribute('customShaderVariation', shader_settings.variation)
             for parameter in shader_settings.shader_parameters:
                 parameter_dict = {'name': parameter.name}
-                if parameter.type == 'float':
-                    value = [parameter.data_float_1]
-                elif parameter.type == 'float2':
-                    value = parameter.data_float_2
-                elif parameter.type == 'float3':
-                    value = parameter.data_float_3
-                elif parameter.type == 'float4':
-                    value = parameter.data_float_4
-                else:
+                data_property = shader_picker.shader_parameter_data_properties.get(parameter.type)
+                if data_property is None:
                     value = []
+                elif parameter.type == 'float':
+                    value = [getattr(parameter, data_property)]
+                else:
+                    value = getattr(parameter, data_property)
 
-                value = ' '.join(map('{0:.6f}'.format, value))
-                parameter_dict['value'] = value
+                parameter_dict['value'] = ' '.join([f"{component:.6f}" for component in value])
 
                 xml_i3d.SubElement(self.element, 'CustomParameter', parameter_dict)
 
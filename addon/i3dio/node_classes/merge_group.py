@@ -14,10 +14,11 @@ from ..i3d import I3D
 
 
 class MergeGroupChild(TransformGroupNode):
-    pass
+    __slots__ = ()
 
 
 class MergeGroupRoot(ShapeNode):
+    __slots__ = ('merge_group_name', 'skin_bind_ids')
 
     def __init__(self, id_: int, merge_group_object: [bpy.types.Object, None], i3d: I3D,
                  parent: [SceneGraphNode or None] = None):
@@ -27,15 +28,16 @@ class MergeGroupRoot(ShapeNode):
 
     # Override default shape behaviour to use the merge group mesh name instead of the blender objects name
     def add_shape(self):
-        self.shape_id = self.i3d.add_shape(EvaluatedMesh(self.i3d, self.blender_object), self.merge_group_name, True)
+        self.shape_id = self.i3d.add_shape(self.blender_object, self.merge_group_name, True)
         self.xml_elements['IndexedTriangleSet'] = self.i3d.shapes[self.shape_id].element
 
     def add_mergegroup_child(self, child: MergeGroupChild):
         self.logger.debug("Adding Child")
         self.skin_bind_ids += f"{child.id:d} "
         self._write_attribute('skinBindNodeIds', self.skin_bind_ids[:-1])
-        self.i3d.shapes[self.shape_id].append_from_evaluated_mesh(
-            EvaluatedMesh(self.i3d, child.blender_object, reference_frame=self.blender_object.matrix_world))
+        evaluated_mesh = EvaluatedMesh(self.i3d, child.blender_object, reference_frame=self.blender_object.matrix_world)
+        self.i3d.shapes[self.shape_id].append_from_evaluated_mesh(evaluated_mesh)
+        evaluated_mesh.clear()
 
     def populate_xml_element(self):
         super().populate_xml_element()
@@ -1,14 +1,12 @@
 from __future__ import annotations  # Enables python 4.0 annotation typehints fx. class self-referencing
 from abc import (ABC, abstractmethod)
 import logging
-from typing import (Union, Dict)
-import math
+from typing import (Union, Dict, Optional)
 import mathutils
 import bpy
 
 from .. import (
             debugging,
-            utility,
             xml_i3d
 )
 
@@ -16,6 +14,10 @@ from ..i3d import I3D
 
 
 class Node(ABC):
+    # Nodes are created for every object, material and file in the export, so they don't carry a __dict__ each. Derived
+    # nodes declare the attributes they add in their own __slots__
+    __slots__ = ('id', 'i3d', 'parent', 'xml_elements', 'logger')
+
     @property
     @classmethod
     @abstractmethod
@@ -62,13 +64,24 @@ class Node(ABC):
         return debugging.ObjectNameAdapter(logging.getLogger(f"{__name__}.{type(self).__name__}"),
                                            {'object_name': self.name})
 
+    @property
+    def _parent_element(self) -> Union[xml_i3d.XML_Element, None]:
+        """The element that the element of this node is created inside of, or None if it starts out on its own"""
+        try:
+            return self.parent.element
+        except AttributeError:
+            return None
+
     def _create_xml_element(self):
         self.logger.debug(f"Filling out basic attributes, {{name='{self.name}', nodeId='{self.id}'}}")
         attributes = {type(self).NAME_FIELD_NAME: self.name, type(self).ID_FIELD_NAME: str(self.id)}
-        try:
-            self.element = xml_i3d.SubElement(self.parent.element, type(self).ELEMENT_TAG, attributes)
-            self.logger.debug(f"has parent element with name [{self.parent.name}]")
-        except AttributeError:
+        # Elements are created directly in their parent whenever possible, since appending an element to another tree
+        # afterwards means that lxml has to move it over between documents
+        parent_element = self._parent_element
+        if parent_element is not None:
+            self.element = xml_i3d.SubElement(parent_element, type(self).ELEMENT_TAG, attributes)
+            self.logger.debug(f"has parent element with tag [{parent_element.tag}]")
+        else:
             self.element = xml_i3d.Element(type(self).ELEMENT_TAG, attributes)
 
     def populate_xml_element(self):
@@ -84,6 +97,7 @@ class Node(ABC):
 
 
 class SceneGraphNode(Node):
+    __slots__ = ('children', 'blender_object')
     NAME_FIELD_NAME = 'name'
     ID_FIELD_NAME = 'nodeId'
 
@@ -158,42 +172,40 @@ class SceneGraphNode(Node):
             # This essentially sets the entire transform to be default. Since GE loads defaults when no data is present.
             return
 
-        self.logger.debug(f"transforming to new transform-basis with {object_transform}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"transforming to new transform-basis with {object_transform}")
         matrix = object_transform
         if self.parent is not None:
-            if type(self.parent) in [CameraNode, LightNode]:
-                matrix = self.i3d.conversion_matrix.inverted() @ matrix
+            if type(self.parent) in (CameraNode, LightNode):
+                matrix = self.i3d.conversion_matrix_inverted @ matrix
                 self.logger.debug(f"Is transformed to accommodate flipped z-axis in GE of parent Light/Camera")
 
-        translation = matrix.to_translation()
-        self.logger.debug(f"translation is {translation}")
-        if not utility.vector_compare(translation, mathutils.Vector((0, 0, 0))):
-            translation = "{0:.6g} {1:.6g} {2:.6g}".format(
-                *[x * bpy.context.scene.unit_settings.scale_length for x in translation])
+        # The matrix is decomposed along with the matrices of all other nodes, once the file is exported
+        self.i3d.add_transform(self, matrix)
 
-            self._write_attribute('translation', translation)
+    def write_transform(self, translation: Optional[str], rotation: Optional[str], scale: Optional[str],
+                        is_negative: bool) -> None:
+        """Writes the decomposed transform, where the components that are default are None"""
+        # The components are already formatted, so they are set directly on the element
+        set_attribute = self.element.set
+        if translation is not None:
+            set_attribute('translation', translation)
             self.logger.debug(f"has translation: [{translation}]")
         else:
             self.logger.debug(f"translation is default")
 
         # Rotation, no unit scaling since it will always be degrees.
-        rotation = [math.degrees(axis) for axis in matrix.to_euler('XYZ')]
-        if not utility.vector_compare(mathutils.Vector(rotation), mathutils.Vector((0, 0, 0))):
-            rotation = "{0:.6g} {1:.6g} {2:.6g}".format(*rotation)
-            self._write_attribute('rotation', rotation)
+        if rotation is not None:
+            set_attribute('rotation', rotation)
             self.logger.debug(f"has rotation(degrees): [{rotation}]")
 
         # Scale
-        if matrix.is_negative:
+        if is_negative:
             self.logger.error(f"has one or more negative scaling components, "
                               f"which is not supported in Giants Engine. Scale reset to (1, 1, 1)")
-        else:
-            scale = matrix.to_scale()
-            if not utility.vector_compare(scale, mathutils.Vector((1, 1, 1))):
-                scale = "{0:.6g} {1:.6g} {2:.6g}".format(*scale)
-
-                self._write_attribute('scale', scale)
-                self.logger.debug(f"has scale: [{scale}]")
+        elif scale is not None:
+            set_attribute('scale', scale)
+            self.logger.debug(f"has scale: [{scale}]")
 
     def populate_xml_element(self):
         self._write_properties()
@@ -212,6 +224,7 @@ class SceneGraphNode(Node):
 
 
 class TransformGroupNode(SceneGraphNode):
+    __slots__ = ()
     ELEMENT_TAG = 'TransformGroup'
 
     def __init__(self, id_: int, empty_object: [bpy.types.Object, bpy.types.Collection],
@@ -223,7 +236,7 @@ class TransformGroupNode(SceneGraphNode):
         try:
             conversion_matrix = self.i3d.conversion_matrix @ \
                                 self.blender_object.matrix_local @ \
-                                self.i3d.conversion_matrix.inverted()
+                                self.i3d.conversion_matrix_inverted
         except AttributeError:
             self.logger.info(f"is a Collection and it will be exported as a transformgroup with default transform")
             conversion_matrix = None
@@ -231,6 +244,7 @@ class TransformGroupNode(SceneGraphNode):
 
 
 class LightNode(SceneGraphNode):
+    __slots__ = ()
     ELEMENT_TAG = 'Light'
 
     def __init__(self, id_: int, light_object: bpy.types.Object, i3d: I3D, parent: SceneGraphNode or None = None):
@@ -240,57 +254,9 @@ class LightNode(SceneGraphNode):
     def _transform_for_conversion(self) -> mathutils.Matrix:
         return self.i3d.conversion_matrix @ self.blender_object.matrix_local
 
-    def populate_xml_element(self):
-        light = self.blender_object.data
-        # self.logger.info(f"Is a light of type {light.type!r}")
-        # falloff_type = None
-        # if light.type == 'POINT':
-        #     light_type = 'point'
-        #     falloff_type = light.falloff_type
-        # elif light.type == 'SUN':
-        #     light_type = 'directional'
-        # elif light.type == 'SPOT':
-        #     light_type = 'spot'
-        #     falloff_type = light.falloff_type
-        #     cone_angle = math.degrees(light.spot_size)
-        #     self._write_attribute('coneAngle', cone_angle)
-        #     self.logger.info(f"Has a cone angle of {cone_angle}")
-        #     # Blender spot 0.0 -> 1.0, GE spot 0.0 -> 5.0
-        #     drop_off = 5.0 * light.spot_blend
-        #     self._write_attribute('dropOff', drop_off)
-        #     self.logger.info(f"Has a drop off of {drop_off}")
-        # elif light.type == 'AREA':
-        #     light_type = 'point'
-        #     self.logger.warning(f"Is an AREA light, which is not supported and defaults to point light")
-        #
-        # self._write_attribute('type', light_type)
-        #
-        # color = "{0:f} {1:f} {2:f}".format(*light.color)
-        # self._write_attribute('color', color)
-        # self.logger.info(f"Has color {color}")
-        #
-        # self._write_attribute('range', light.cutoff_distance)
-        # self.logger.info(f"Has range {light.cutoff_distance}")
-        #
-        # self._write_attribute('castShadowMap', light.use_shadow)
-        # self.logger.info('casts shadows' if light.use_shadow else 'does not cast shadows')
-        #
-        # if falloff_type is not None:
-        #     if falloff_type == 'CONSTANT':
-        #         falloff_type = 0
-        #         self.logger.info(f"Has decay rate of type {'CONSTANT'} which is '0' in i3d")
-        #     elif falloff_type == 'INVERSE_LINEAR':
-        #         falloff_type = 1
-        #         self.logger.info(f"Has decay rate of type {'INVERSE_LINEAR'} which is '1' in i3d")
-        #     elif falloff_type == 'INVERSE_SQUARE':
-        #         falloff_type = 2
-        #         self.logger.info(f"has decay rate of type {'INVERSE_SQUARE'} which is '2' in i3d")
-        #     self._write_attribute('decayRate', falloff_type)
-
-        super().populate_xml_element()
-
 
 class CameraNode(SceneGraphNode):
+    __slots__ = ()
     ELEMENT_TAG = 'Camera'
 
     def __init__(self, id_: int, camera_object: bpy.types.Object, i3d: I3D, parent: SceneGraphNode or None = None):
@@ -302,12 +268,16 @@ class CameraNode(SceneGraphNode):
 
     def populate_xml_element(self):
         camera = self.blender_object.data
-        self._write_attribute('fov', camera.lens)
-        self._write_attribute('nearClip', camera.clip_start)
-        self._write_attribute('farClip', camera.clip_end)
-        self.logger.info(f"FOV: '{camera.lens}', Near Clip: '{camera.clip_start}', Far Clip: '{camera.clip_end}'")
+        # Every property access on blender data goes through RNA, so each property is only read once
+        lens, clip_start, clip_end = camera.lens, camera.clip_start, camera.clip_end
+        set_attribute = self.element.set
+        set_attribute('fov', f"{lens:.6g}")
+        set_attribute('nearClip', f"{clip_start:.6g}")
+        set_attribute('farClip', f"{clip_end:.6g}")
+        self.logger.info(f"FOV: '{lens}', Near Clip: '{clip_start}', Far Clip: '{clip_end}'")
         if camera.type == 'ORTHO':
-            self._write_attribute('orthographic', True)
-            self._write_attribute('orthographicHeight', camera.ortho_scale)
-            self.logger.info(f"Orthographic camera with height '{camera.ortho_scale}'")
+            ortho_scale = camera.ortho_scale
+            set_attribute('orthographic', 'true')
+            set_attribute('orthographicHeight', f"{ortho_scale:.6g}")
+            self.logger.info(f"Orthographic camera with height '{ortho_scale}'")
         super().populate_xml_element()
@@ -2,7 +2,8 @@ import math
 import mathutils
 import collections
 import logging
-from typing import (OrderedDict, Optional, List, Dict, ChainMap)
+from typing import (OrderedDict, Optional, List, Dict, ChainMap, Tuple, Iterable)
+import numpy as np
 import bpy
 
 from .node import (Node, SceneGraphNode)
@@ -10,14 +11,24 @@ from .node import (Node, SceneGraphNode)
 from .. import (debugging, xml_i3d)
 from ..i3d import I3D
 
+# GE supports up to 4 uv layers. The names of the vertex attributes and of the flags on <Vertices> are spelled out per
+# layer, so every vertex of every shape shares the same interned string objects as attribute keys
+uv_vertex_attributes = ('t0', 't1', 't2', 't3')
+uv_vertices_attributes = ('uv0', 'uv1', 'uv2', 'uv3')
+
 
 class SubSet:
+    __slots__ = ('first_index', 'first_vertex', 'number_of_indices', 'number_of_vertices', 'number_of_triangles',
+                 'unprocessed_triangle_loops', 'material_id')
+
     def __init__(self, material_id: int):
         self.first_index = 0
         self.first_vertex = 0
         self.number_of_indices = 0
         self.number_of_vertices = 0
-        self.triangles = []
+        self.number_of_triangles = 0
+        # The loops of the triangles that are yet to be processed, as (n, 3) arrays in the order they were added
+        self.unprocessed_triangle_loops: List[np.ndarray] = []
         self.material_id = material_id
 
     def as_dict(self):
@@ -28,67 +39,63 @@ class SubSet:
         return subset_attributes
 
     def __str__(self):
-        return f'materialId="{self.material_id}" numTriangles="{len(self.triangles)}" ' \
+        return f'materialId="{self.material_id}" numTriangles="{self.number_of_triangles}" ' \
                f'firstIndex="{self.first_index}" firstVertex="{self.first_vertex}" ' \
                f'numIndices="{self.number_of_indices}" numVertices="{self.number_of_vertices}"'
 
-    def add_triangle(self, triangle):
-        self.triangles.append(triangle)
-
-
-class Vertex:
-    def __init__(self, material_name, position, normal, vertex_color, uvs, blend_ids=None, blend_weights=None):
-        self._material_name = material_name
-        self._position = position
-        self._normal = normal
-        self._vertex_color = vertex_color
-        self._uvs = uvs
-        self._blend_ids = blend_ids
-        self._blend_weights = blend_weights
-        self._str = ''
-        self._make_hash_string()
-
-    def _make_hash_string(self):
-        self._str = f"{self._material_name}{self._position}{self._normal}{self._vertex_color}"
-
-        for uv in self._uvs:
-            self._str += f"{uv}"
-
-    def __str__(self):
-        return self._str
-
-    def __hash__(self):
-        return hash(self._str)
-
-    def __eq__(self, other):
-        return f"{self!s}" == f'{other!s}'
-
-    def position_for_xml(self):
-        return "{0:.6f} {1:.6f} {2:.6f}".format(*self._position)
-
-    def normal_for_xml(self):
-        return "{0:.6f} {1:.6f} {2:.6f}".format(*self._normal)
-
-    def vertex_color_for_xml(self):
-        if self._vertex_color is not None:
-            return "{0:.6f} {1:.6f} {2:.6f} {3:.6f}".format(*self._vertex_color)
+    def add_triangles(self, triangle_loops: np.ndarray):
+        self.unprocessed_triangle_loops.append(triangle_loops)
+        self.number_of_triangles += len(triangle_loops)
+
+    def take_unprocessed_loops(self) -> np.ndarray:
+        """Returns the loops of all triangles added since the last call as one contiguous array"""
+        if not self.unprocessed_triangle_loops:
+            return np.empty(0, dtype=np.int32)
+        loops = np.concatenate(self.unprocessed_triangle_loops).reshape(-1)
+        self.unprocessed_triangle_loops.clear()
+        return loops
+
+
+def unique_rows(rows: np.ndarray) -> (np.ndarray, np.ndarray):
+    """Finds the unique rows of a 2D array, ordered by where they first appear
+
+    Returns:
+        The index of the first appearance of every unique row and for every row the index of the unique row it is equal
+        to. Keeping the order of first appearance means that vertices are numbered in the order that triangles use them
+    """
+    # Every row is viewed as a single opaque value of its raw bytes, which numpy compares a lot faster than the rows
+    # themselves, that it would otherwise compare field by field
+    rows = np.ascontiguousarray(rows)
+    row_values = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).reshape(-1)
+    _, first_indexes, inverse = np.unique(row_values, return_index=True, return_inverse=True)
+    order = np.argsort(first_indexes)
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return first_indexes[order], ranks[inverse.reshape(-1)]
+
+
+def deduplicate_vertex_data(columns: Dict[str, np.ndarray]) -> (List[Dict[str, str]], np.ndarray):
+    """Merges the loops that share all of their vertex data into single vertices and formats those for the xml. Returns
+    the xml attributes of every vertex and the vertex index of every loop."""
+    rows = np.hstack([column.reshape(len(column), -1) for column in columns.values()])
+    unique_loops, vertex_indexes = unique_rows(rows)
+
+    vertex_attributes = [dict() for _ in range(len(unique_loops))]
+    for attribute, column in columns.items():
+        values = column[unique_loops]
+        if attribute == 'bi':
+            values_for_xml = xml_i3d.format_vectors(values.astype(np.int32), '%d')
         else:
-            return ''
-
-    def uvs_for_xml(self):
-        uvs = []
-        for uv in self._uvs:
-            uvs.append("{0:.6f} {1:.6f}".format(*uv))
-        return uvs
-
-    def blend_ids_for_xml(self):
-        return "{0:d} {1:d} {2:d} {3:d}".format(*self._blend_ids)
-
-    def blend_weights_for_xml(self):
-        return "{0:.6f} {1:.6f} {2:.6f} {3:.6f}".format(*self._blend_weights)
+            values_for_xml = xml_i3d.format_vectors(values)
+        for attributes, value in zip(vertex_attributes, values_for_xml):
+            attributes[attribute] = value
+    return vertex_attributes, vertex_indexes
 
 
 class EvaluatedMesh:
+    __slots__ = ('name', 'i3d', 'object', 'mesh', 'loop_vertex_indexes', 'positions', 'normals', 'triangle_loops',
+                 'triangle_material_indexes', 'uvs', 'colors', 'is_copy', 'logger')
+
     def __init__(self, i3d: I3D, mesh_object: bpy.types.Object, name: str = None,
                  reference_frame: mathutils.Matrix = None):
         if name is None:
@@ -98,11 +105,40 @@ class EvaluatedMesh:
         self.i3d = i3d
         self.object = None
         self.mesh = None
+        self.loop_vertex_indexes = None
+        self.positions = None
+        self.normals = None
+        self.triangle_loops = None
+        self.triangle_material_indexes = None
+        self.uvs = None
+        self.colors = None
+        # Whether the mesh is a temporary copy from `to_mesh` or the actual data of the object
+        self.is_copy = False
         self.logger = debugging.ObjectNameAdapter(logging.getLogger(f"{__name__}.{type(self).__name__}"),
                                                   {'object_name': self.name})
         self.generate_evaluated_mesh(mesh_object, reference_frame)
 
     def generate_evaluated_mesh(self, mesh_object: bpy.types.Object, reference_frame: mathutils.Matrix = None):
+        conversion_matrix = self.i3d.conversion_matrix
+        if self.i3d.get_setting('apply_unit_scale'):
+            self.logger.debug(f"applying unit scaling")
+            conversion_matrix = \
+                mathutils.Matrix.Scale(self.i3d.unit_scale, 4) @ conversion_matrix
+
+        # A mesh without modifiers and shape keys evaluates to exactly its own data, so it can be read directly instead
+        # of making a full copy of it. Material slots linked to the object are only part of the copy though, and placing
+        # the mesh in another reference frame can scale it non-uniformly, so that is still left to blender. In edit mode
+        # the data of the mesh isn't updated until leaving it. With auto smooth or custom normals the split normals
+        # would have to be calculated onto the users mesh, so those meshes are copied as well.
+        # The mesh datablock can be in edit mode through another object sharing it, so check the data itself
+        if reference_frame is None and mesh_object.mode != 'EDIT' and not mesh_object.data.is_editmode \
+                and not mesh_object.modifiers and mesh_object.data.shape_keys is None \
+                and not mesh_object.data.use_auto_smooth and not mesh_object.data.has_custom_normals \
+                and all(slot.link == 'DATA' for slot in mesh_object.material_slots):
+            self.logger.debug(f"has no modifiers or shape keys, reading mesh data directly")
+            self._read_mesh_data(mesh_object, conversion_matrix)
+            return
+
         if self.i3d.get_setting('apply_modifiers'):
             self.object = mesh_object.evaluated_get(self.i3d.depsgraph)
             self.logger.debug(f"is exported with modifiers applied")
@@ -111,18 +147,13 @@ class EvaluatedMesh:
             self.logger.debug(f"is exported without modifiers applied")
 
         self.mesh = self.object.to_mesh(preserve_all_data_layers=False, depsgraph=self.i3d.depsgraph)
+        self.is_copy = True
 
         # If a reference is given transform the generated mesh by that frame to place it somewhere else than center of
         # the mesh origo
         if reference_frame is not None:
             self.mesh.transform(reference_frame.inverted() @ self.object.matrix_world)
 
-        conversion_matrix = self.i3d.conversion_matrix
-        if self.i3d.get_setting('apply_unit_scale'):
-            self.logger.debug(f"applying unit scaling")
-            conversion_matrix = \
-                mathutils.Matrix.Scale(bpy.context.scene.unit_settings.scale_length, 4) @ conversion_matrix
-
         self.mesh.transform(conversion_matrix)
         if conversion_matrix.is_negative:
             self.mesh.flip_normals()
@@ -133,27 +164,135 @@ class EvaluatedMesh:
         # Recalculates normals after the scaling has messed with them
         self.mesh.calc_normals_split()
 
-    # On hold for the moment, it seems to be triggered at random times in the middle of an export which messes with
-    # everything. Further investigation is needed.
-    def __del__(self):
-        pass
-        #self.object.to_mesh_clear()
+        self._extract_vertex_data()
+
+    def _read_mesh_data(self, mesh_object: bpy.types.Object, conversion_matrix: mathutils.Matrix):
+        """Reads the data of the mesh directly and does the conversion on the extracted arrays instead of on a copy
+
+        The only data calculated onto the users mesh is its loop triangles, which is a runtime cache that blender builds
+        the same way itself whenever the mesh is drawn. The split normals are derived from the vertex and polygon normals
+        instead of being calculated onto the mesh, which only gives the same result without auto smooth or custom
+        normals.
+        """
+        self.object = mesh_object
+        self.mesh = mesh_object.data
+        self.mesh.calc_loop_triangles()
+        self._extract_vertex_data(split_normals=False)
+
+        matrix = np.array(conversion_matrix, dtype=np.float32)
+        self.positions = self.positions @ matrix[:3, :3].T + matrix[:3, 3]
+        # Normals are transformed by the inverse transpose, so they stay perpendicular to the surface
+        normals = self.normals @ np.linalg.inv(matrix[:3, :3])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        self.normals = np.divide(normals, lengths, out=normals, where=lengths != 0)
+        if conversion_matrix.is_negative:
+            # A mirroring conversion reverses the winding of the triangles, so it is turned back like flipping the
+            # normals of a converted copy would
+            self.triangle_loops = np.ascontiguousarray(self.triangle_loops[:, ::-1])
+            self.logger.debug(f"conversion matrix is negative, reversing triangle winding")
+
+    def _extract_vertex_data(self, split_normals: bool = True):
+        """Fetches positions and split normals in bulk, instead of reading them through the RNA for every single loop of
+        every triangle. The split normals must have been calculated on the mesh, unless split_normals is False, in which
+        case the normals of the loops are derived from the normals of their vertices and polygons instead"""
+        # The arrays are only needed until the subsets have been processed, which copies out the data they use. So the
+        # same buffers are reused for every mesh, rather than allocating them all over again.
+        scratch_buffer = self.i3d.scratch_buffer
+        self.positions = scratch_buffer('positions', len(self.mesh.vertices) * 3, np.float32)
+        self.mesh.vertices.foreach_get('co', self.positions)
+        self.positions = self.positions.reshape(-1, 3)
+        self.loop_vertex_indexes = scratch_buffer('loop_vertex_indexes', len(self.mesh.loops), np.int32)
+        self.mesh.loops.foreach_get('vertex_index', self.loop_vertex_indexes)
+        if split_normals:
+            self.normals = scratch_buffer('normals', len(self.mesh.loops) * 3, np.float32)
+            self.mesh.loops.foreach_get('normal', self.normals)
+            self.normals = self.normals.reshape(-1, 3)
+        else:
+            self.normals = self._loop_normals_from_polygons()
+        self.triangle_loops = scratch_buffer('triangle_loops', len(self.mesh.loop_triangles) * 3, np.int32)
+        self.mesh.loop_triangles.foreach_get('loops', self.triangle_loops)
+        self.triangle_loops = self.triangle_loops.reshape(-1, 3)
+        self.triangle_material_indexes = scratch_buffer('triangle_material_indexes', len(self.mesh.loop_triangles),
+                                                        np.int32)
+        self.mesh.loop_triangles.foreach_get('material_index', self.triangle_material_indexes)
+
+        # GE supports up to 4 uv layers, which are fetched a layer at a time instead of a loop at a time
+        uv_keys = self.mesh.uv_layers.keys()
+        if self.i3d.get_setting('alphabetic_uvs'):
+            uv_keys = sorted(uv_keys)
+        self.uvs = []
+        for count, uv_key in enumerate(uv_keys[:len(uv_vertex_attributes)]):
+            uv = scratch_buffer(uv_vertices_attributes[count], len(self.mesh.loops) * 2, np.float32)
+            self.mesh.uv_layers[uv_key].data.foreach_get('uv', uv)
+            self.uvs.append(uv.reshape(-1, 2))
+
+        # Get the color from the active layer, since only one vertex color layer is supported in GE
+        self.colors = None
+        if len(self.mesh.vertex_colors):
+            self.colors = scratch_buffer('colors', len(self.mesh.loops) * 4, np.float32)
+            self.mesh.vertex_colors.active.data.foreach_get('color', self.colors)
+            self.colors = self.colors.reshape(-1, 4)
+
+    def _loop_normals_from_polygons(self) -> np.ndarray:
+        """Without auto smooth or custom normals the split normal of a loop is the normal of its vertex when its polygon
+        is smooth shaded and the normal of the polygon when it is flat shaded. Those are read without changing the mesh,
+        unlike calculating the split normals"""
+        mesh = self.mesh
+        vertex_normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('normal', vertex_normals)
+        polygon_normals = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+        mesh.polygons.foreach_get('normal', polygon_normals)
+        polygon_smooth = np.empty(len(mesh.polygons), dtype=bool)
+        mesh.polygons.foreach_get('use_smooth', polygon_smooth)
+        loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_starts)
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get('loop_total', loop_totals)
+
+        # The polygon of every loop, without relying on the polygons storing their loops in order
+        loop_polygons = np.empty(len(mesh.loops), dtype=np.int32)
+        loop_polygons[np.repeat(loop_starts - np.cumsum(loop_totals) + loop_totals, loop_totals)
+                      + np.arange(len(mesh.loops))] = np.repeat(np.arange(len(mesh.polygons)), loop_totals)
+
+        return np.where(polygon_smooth[loop_polygons, np.newaxis],
+                        vertex_normals.reshape(-1, 3)[self.loop_vertex_indexes],
+                        polygon_normals.reshape(-1, 3)[loop_polygons])
+
+    def clear(self):
+        """Frees the temporary mesh once all of its data has been processed. This is done explicitly, since relying on
+        the garbage collector lets it happen at random times in the middle of an export"""
+        if self.is_copy:
+            self.object.to_mesh_clear()
+        self.mesh = None
+        # The arrays are views into buffers which are reused by the next mesh
+        self.positions = self.normals = self.loop_vertex_indexes = None
+        self.triangle_loops = self.triangle_material_indexes = self.uvs = self.colors = None
 
 
 class IndexedTriangleSet(Node):
     ELEMENT_TAG = 'IndexedTriangleSet'
     NAME_FIELD_NAME = 'name'
     ID_FIELD_NAME = 'shapeId'
+    __slots__ = ('evaluated_mesh', 'vertices', 'triangles', 'uv_count', 'has_vertex_colors', 'subsets', 'vertex_data',
+                 'material_indexes', 'shape_id_string', 'is_merge_group', 'bone_mapping', 'bind_index',
+                 'vertex_group_ids', 'tangent', 'shape_name')
 
     def __init__(self, id_: int, i3d: I3D, evaluated_mesh: EvaluatedMesh, shape_name: Optional[str] = None,
                  is_merge_group: bool = False, bone_mapping: ChainMap = None):
         self.id: int = id_
         self.i3d: I3D = i3d
         self.evaluated_mesh: EvaluatedMesh = evaluated_mesh
-        self.vertices: OrderedDict[Vertex, int] = collections.OrderedDict()
-        self.triangles: List[List[int]] = list()  # List of lists of vertex indexes
+        self.vertices: List[Dict[str, str]] = list()  # The xml attributes of every vertex
+        self.triangles: List[str] = list()  # List of formatted vertex index triplets
+        self.uv_count = 0
+        self.has_vertex_colors = False
         self.subsets: OrderedDict[str, SubSet] = collections.OrderedDict()
+        # The vertex data of every processed subset as (material name, data columns, bind index), which is deduplicated
+        # and written to the xml once all shapes have been collected
+        self.vertex_data: List[Tuple[str, Dict[str, np.ndarray], Optional[int]]] = list()
+        # The materialIds of every shape node that uses this shape, which is built once and then shared by all of them
         self.material_indexes: str = ''
+        self.shape_id_string: str = str(id_)
         self.is_merge_group = is_merge_group
         self.bone_mapping: ChainMap = bone_mapping
         self.bind_index = 0
@@ -183,104 +322,143 @@ class IndexedTriangleSet(Node):
     def element(self, value):
         self.xml_elements['node'] = value
 
-    def process_subsets(self, mesh):
-        for idx, (material_name, subset) in enumerate(self.subsets.items()):
-            self.logger.debug(f"Subset with index [{idx}] based on material '{material_name}'")
-
-            if idx > 0:
-                self.logger.debug(f"Previous subset exists")
-                _, previous_subset = list(self.subsets.items())[idx-1]
-                subset.first_vertex = previous_subset.first_vertex + previous_subset.number_of_vertices
-                subset.first_index = previous_subset.first_index + previous_subset.number_of_indices
+    @property
+    def _parent_element(self):
+        return self.i3d.xml_elements['Shapes']
 
-            self.process_subset(mesh, material_name)
+    def process_subsets(self):
+        for idx, material_name in enumerate(self.subsets.keys()):
+            self.logger.debug(f"Subset with index [{idx}] based on material '{material_name}'")
+            self.process_subset(self.evaluated_mesh, material_name)
 
-    def process_subset(self, mesh, material_name: str, triangle_offset: int = 0):
+    def process_subset(self, evaluated_mesh: EvaluatedMesh, material_name: str):
+        mesh = evaluated_mesh.mesh
         subset = self.subsets[material_name]
         self.logger.debug(f"Processing subset: {subset}")
-        for triangle in subset.triangles[triangle_offset:]:
-
-            # Add a new empty container for the vertex indexes of the triangle
-            self.triangles.append(list())
-
-            for loop_index in triangle.loops:
-                blender_vertex = mesh.vertices[mesh.loops[loop_index].vertex_index]
-
-                # Add vertex color
-                vertex_color = None
-                if len(mesh.vertex_colors):
-                    # Get the color from the active layer, since only one vertex color layer is supported in GE
-                    vertex_color = mesh.vertex_colors.active.data[loop_index].color
-
-                # Add uvs
-                uvs = []
-                uv_keys = mesh.uv_layers.keys()
-                if self.i3d.settings['alphabetic_uvs']:
-                    uv_keys = sorted(uv_keys)
-
-                for count, uv_key in enumerate(uv_keys):
-                    if count < 4:
-                        uvs.append(mesh.uv_layers.get(uv_key).data[loop_index].uv)
-
-                blend_weights = []
-                blend_ids = []
-                if self.bone_mapping is not None:
-                    for vertex_group in blender_vertex.groups:
-                        # Filter out any potential vertex groups that aren't related to armatures
-                        if self.evaluated_mesh.object.vertex_groups[vertex_group.group].name in self.bone_mapping:
-                            if len(blend_ids) < 4:
-                                # Filters out weightings that are less than the decimal precision of i3d anyway
-                                if not math.isclose(vertex_group.weight, 0, abs_tol=0.000001):
-                                    if vertex_group.group not in self.vertex_group_ids:
-                                        self.vertex_group_ids[vertex_group.group] = len(self.vertex_group_ids)
-                                    blend_ids.append(self.vertex_group_ids[vertex_group.group])
-                                    blend_weights.append(vertex_group.weight)
-                            else:
-                                self.logger.warning(f"Vertex has weights from more than 4 bones! Rest of bones will be"
-                                                    f"ignored for export!")
-                                break
-
-                    if len(blend_ids) == 0:
-                        self.logger.warning("Has a vertex with 0.0 weight to all bones. "
-                                            "This will confuse GE and results in the mesh showing up as just a "
-                                            "wireframe. Please correct by assigning some weight to all vertices")
-
-                    if len(blend_ids) < 4:
-                        padding = [0]*(4-len(blend_ids))
-                        blend_ids += padding
-                        blend_weights += padding
-
-                vertex = Vertex(material_name,
-                                blender_vertex.co.xyz,
-                                mesh.loops[loop_index].normal,
-                                vertex_color,
-                                uvs,
-                                blend_ids,
-                                blend_weights)
-
-                if vertex not in self.vertices:
-                    vertex_index = len(self.vertices)
-                    self.vertices[vertex] = vertex_index
-                    subset.number_of_vertices += 1
+        loops = subset.take_unprocessed_loops()
+        if not len(loops):
+            return
+        vertex_indexes = evaluated_mesh.loop_vertex_indexes[loops]
+
+        # Every loop becomes a row with all of the data that makes up a vertex in GE, so that duplicates can be found
+        # with a single pass over all of the rows, instead of hashing every vertex one by one. Only the reading of the
+        # blender data happens here, the deduplication itself is deferred until the file is exported.
+        columns = {'p': evaluated_mesh.positions[vertex_indexes], 'n': evaluated_mesh.normals[loops]}
+
+        # Merge group children can have other uv and color layers than the root, but the flags on <Vertices> cover
+        # every vertex of the shape, so they are the union of all of the processed subsets
+        self.uv_count = max(self.uv_count, len(evaluated_mesh.uvs))
+        for count, uv in enumerate(evaluated_mesh.uvs):
+            columns[uv_vertex_attributes[count]] = uv[loops]
+
+        if evaluated_mesh.colors is not None:
+            self.has_vertex_colors = True
+            columns['c'] = evaluated_mesh.colors[loops]
+
+        if self.bone_mapping is not None:
+            blend_data = {}
+            for vertex_index in vertex_indexes.tolist():
+                if vertex_index not in blend_data:
+                    blend_data[vertex_index] = self._blend_data(mesh, vertex_index)
+            blend_ids, blend_weights = zip(*[blend_data[vertex_index] for vertex_index in vertex_indexes.tolist()])
+            columns['bw'] = np.array(blend_weights, dtype=np.float32)
+            columns['bi'] = np.array(blend_ids, dtype=np.float32)
+
+        self.vertex_data.append((material_name, columns, self.bind_index if self.is_merge_group else None))
+
+    def write_vertex_data(self, deduplicated_vertex_data: Iterable[Tuple[List[Dict[str, str]], np.ndarray]]):
+        """Writes the vertices, triangles and subsets to the xml, from the deduplicated vertex data of every processed
+        subset in the order they were processed"""
+        if not self.vertex_data:
+            return
+
+        for (material_name, _, bind_index), (vertex_attributes, vertex_indexes_in_subset) \
+                in zip(self.vertex_data, deduplicated_vertex_data):
+            subset = self.subsets[material_name]
+            # Subsets start where the vertices and indexes written before them end, while data appended to an
+            # existing subset by merge group children just extends it
+            if subset.number_of_vertices == 0:
+                subset.first_vertex = len(self.vertices)
+                subset.first_index = len(self.triangles) * 3
+
+            if bind_index is not None:
+                for attributes in vertex_attributes:
+                    attributes['bi'] = str(bind_index)
+
+            vertex_indexes_in_subset += len(self.vertices)
+            self.vertices.extend(vertex_attributes)
+            self.triangles.extend(xml_i3d.format_vectors(vertex_indexes_in_subset.reshape(-1, 3), '%d').tolist())
+            subset.number_of_vertices += len(vertex_attributes)
+            subset.number_of_indices += len(vertex_indexes_in_subset)
+
+            self.logger.debug(f"Has subset '{material_name}' with '{subset.number_of_triangles}' triangles "
+                              f"and {subset}")
+        self.vertex_data.clear()
+
+        self.logger.debug(f"Has '{len(self.subsets)}' subsets, "
+                          f"'{len(self.triangles)}' triangles and "
+                          f"'{len(self.vertices)}' vertices")
+
+        self.write_vertices()
+        self.write_triangles()
+
+        # Subsets
+        self.xml_elements['subsets'].set('count', str(len(self.subsets)))
+
+        # Write subsets
+        for subset in self.subsets.values():
+            xml_i3d.SubElement(self.xml_elements['subsets'], 'Subset', subset.as_dict())
+
+    def _blend_data(self, mesh, vertex_index: int) -> (List[int], List[float]):
+        """Finds the bones that the vertex is weighted to, as bone indexes for the shape and their weights"""
+        blend_ids = []
+        blend_weights = []
+        for vertex_group in mesh.vertices[vertex_index].groups:
+            # Filter out any potential vertex groups that aren't related to armatures
+            if self.evaluated_mesh.object.vertex_groups[vertex_group.group].name in self.bone_mapping:
+                if len(blend_ids) < 4:
+                    # Filters out weightings that are less than the decimal precision of i3d anyway
+                    if not math.isclose(vertex_group.weight, 0, abs_tol=0.000001):
+                        if vertex_group.group not in self.vertex_group_ids:
+                            self.vertex_group_ids[vertex_group.group] = len(self.vertex_group_ids)
+                        blend_ids.append(self.vertex_group_ids[vertex_group.group])
+                        blend_weights.append(vertex_group.weight)
                 else:
-                    vertex_index = self.vertices[vertex]
+                    self.logger.warning(f"Vertex has weights from more than 4 bones! Rest of bones will be"
+                                        f"ignored for export!")
+                    break
 
-                self.triangles[-1].append(vertex_index)
+        if len(blend_ids) == 0:
+            self.logger.warning("Has a vertex with 0.0 weight to all bones. "
+                                "This will confuse GE and results in the mesh showing up as just a "
+                                "wireframe. Please correct by assigning some weight to all vertices")
 
-            subset.number_of_indices += 3
+        if len(blend_ids) < 4:
+            padding = [0]*(4-len(blend_ids))
+            blend_ids += padding
+            blend_weights += padding
 
-        self.logger.debug(f"Has subset '{material_name}' with '{len(subset.triangles)}' triangles and {subset}")
+        return blend_ids, blend_weights
 
     def populate_from_evaluated_mesh(self):
         mesh = self.evaluated_mesh.mesh
 
-        if len(mesh.materials) == 0:
+        # The materials are gathered in a list of their own, since the mesh might be the actual data of the object
+        materials = list(mesh.materials)
+        if len(materials) == 0:
             self.logger.info(f"has no material assigned, assigning default material")
-            mesh.materials.append(self.i3d.get_default_material().blender_material)
+            materials.append(self.i3d.get_default_material().blender_material)
             self.logger.info(f"assigned default material i3d_default_material")
 
-        for triangle in mesh.loop_triangles:
-            triangle_material = mesh.materials[triangle.material_index]
+        # A single stable sort groups the triangles by material slot, while keeping them in mesh order within each slot
+        material_indexes = self.evaluated_mesh.triangle_material_indexes
+        triangle_order = np.argsort(material_indexes, kind='stable')
+        slots, slot_starts = np.unique(material_indexes[triangle_order], return_index=True)
+        slot_triangles = np.split(triangle_order, slot_starts[1:])
+
+        # Subsets are ordered by which of their materials is used first in the mesh
+        for slot, triangles in sorted(zip(slots.tolist(), slot_triangles), key=lambda x: x[1][0]):
+            triangle_material = materials[slot]
 
             if triangle_material.name not in self.subsets:
                 self.logger.info(f"Has material {triangle_material.name!r}")
@@ -292,10 +470,10 @@ class IndexedTriangleSet(Node):
                     self.tangent = True
                 self.subsets[triangle_material.name] = SubSet(material_id)
 
-            # Add triangle to subset
-            self.subsets[triangle_material.name].add_triangle(triangle)
+            # Add triangles to subset, as a contiguous copy of just their loops
+            self.subsets[triangle_material.name].add_triangles(self.evaluated_mesh.triangle_loops[triangles])
 
-        self.process_subsets(mesh)
+        self.process_subsets()
 
     def append_from_evaluated_mesh(self, mesh_to_append):
         if not self.is_merge_group:
@@ -319,92 +497,55 @@ class IndexedTriangleSet(Node):
                 return
 
         material_name = mesh.materials[0].name
-        triangle_offset = len(self.subsets[material_name].triangles)
-        vertex_offset = self.subsets[material_name].number_of_vertices
-        for triangle in mesh.loop_triangles:
-            self.subsets[material_name].add_triangle(triangle)
+        self.subsets[material_name].add_triangles(mesh_to_append.triangle_loops)
 
         self.bind_index += 1
-        self.process_subset(mesh, material_name, triangle_offset)
-        self.write_vertices(vertex_offset)
-        self.write_triangles(triangle_offset)
-        subset = list(self.xml_elements['subsets'])[0]
-        for key, value in self.subsets[material_name].as_dict().items():
-            subset.set(key, value)
-
-    def write_vertices(self, offset=0):
-        # Vertices
-        self._write_attribute('count', len(self.vertices), 'vertices')
-        self._write_attribute('normal', True, 'vertices')
+        self.process_subset(mesh_to_append, material_name)
+
+    def write_vertices(self):
+        # Vertices, the attributes are set directly since their types are known up front
+        vertices_element = self.xml_elements['vertices']
+        set_attribute = vertices_element.set
+        set_attribute('count', str(len(self.vertices)))
+        set_attribute('normal', 'true')
         if self.tangent:
-            self._write_attribute('tangent', True, 'vertices')
-        for count, _ in enumerate(list(self.vertices.keys())[0].uvs_for_xml()):
-            self._write_attribute(f"uv{count}", True, 'vertices')
+            set_attribute('tangent', 'true')
+        for uv_attribute in uv_vertices_attributes[:self.uv_count]:
+            set_attribute(uv_attribute, 'true')
 
         if self.is_merge_group:
-            self._write_attribute('singleblendweights', True, 'vertices')
+            set_attribute('singleblendweights', 'true')
         elif self.bone_mapping is not None:
-            self._write_attribute('blendweights', True, 'vertices')
+            set_attribute('blendweights', 'true')
 
         # Write vertices to xml
-        vertices_has_colors = False
-        for vertex in list(self.vertices.keys())[offset:]:
-            vertex_attributes = {'p': vertex.position_for_xml(),
-                                 'n': vertex.normal_for_xml()
-                                 }
-
-            for count, uv in enumerate(vertex.uvs_for_xml()):
-                vertex_attributes[f"t{count}"] = uv
-
-            vertex_color = vertex.vertex_color_for_xml()
-            if vertex_color != '':
-                vertices_has_colors = True
-                vertex_attributes['c'] = vertex_color
-
-            if self.is_merge_group:
-                vertex_attributes['bi'] = str(self.bind_index)
-            elif self.bone_mapping is not None:
-                vertex_attributes['bw'] = vertex.blend_weights_for_xml()
-                vertex_attributes['bi'] = vertex.blend_ids_for_xml()
+        for vertex_attributes in self.vertices:
+            xml_i3d.SubElement(vertices_element, 'v', vertex_attributes)
 
-            xml_i3d.SubElement(self.xml_elements['vertices'], 'v', vertex_attributes)
+        if self.has_vertex_colors:
+            set_attribute('color', 'true')
 
-        if vertices_has_colors:
-            self._write_attribute('color', True, 'vertices')
-
-    def write_triangles(self, offset=0):
-        self._write_attribute('count', len(self.triangles), 'triangles')
+    def write_triangles(self):
+        self.xml_elements['triangles'].set('count', str(len(self.triangles)))
 
         # Write triangles to xml
-        for triangle in self.triangles[offset:]:
-            xml_i3d.SubElement(self.xml_elements['triangles'], 't', {'vi': "{0} {1} {2}".format(*triangle)})
+        for vertex_indexes in self.triangles:
+            xml_i3d.SubElement(self.xml_elements['triangles'], 't', {'vi': vertex_indexes})
 
     def populate_xml_element(self):
         if len(self.evaluated_mesh.mesh.vertices) == 0:
             self.logger.warning(f"has no vertices! Export of this mesh is aborted.")
+            self.evaluated_mesh.clear()
             return
         self.populate_from_evaluated_mesh()
-        self.logger.debug(f"Has '{len(self.subsets)}' subsets, "
-                          f"'{len(self.triangles)}' triangles and "
-                          f"'{len(self.vertices)}' vertices")
-
-        self.write_vertices()
-        self.write_triangles()
-
-        # Subsets
-        self._write_attribute('count', len(self.subsets), 'subsets')
-
-        # Write subsets
-        for _, subset in self.subsets.items():
-            self.material_indexes += f"{subset.material_id} "
-            xml_i3d.SubElement(self.xml_elements['subsets'], 'Subset', subset.as_dict())
+        self.evaluated_mesh.clear()
 
-        # Removes the last whitespace from the string, since an extra will always be added
-        self.material_indexes = self.material_indexes.strip()
+        self.material_indexes = ' '.join([str(subset.material_id) for subset in self.subsets.values()])
 
 
 class ShapeNode(SceneGraphNode):
     ELEMENT_TAG = 'Shape'
+    __slots__ = ('shape_id',)
 
     def __init__(self, id_: int, mesh_object: [bpy.types.Object, None], i3d: I3D,
                  parent: [SceneGraphNode or None] = None):
@@ -413,15 +554,18 @@ class ShapeNode(SceneGraphNode):
 
     @property
     def _transform_for_conversion(self) -> mathutils.Matrix:
-        return self.i3d.conversion_matrix @ self.blender_object.matrix_local @ self.i3d.conversion_matrix.inverted()
+        return self.i3d.conversion_matrix @ self.blender_object.matrix_local @ self.i3d.conversion_matrix_inverted
 
     def add_shape(self):
-        self.shape_id = self.i3d.add_shape(EvaluatedMesh(self.i3d, self.blender_object))
+        self.shape_id = self.i3d.add_shape(self.blender_object)
         self.xml_elements['IndexedTriangleSet'] = self.i3d.shapes[self.shape_id].element
 
     def populate_xml_element(self):
         self.add_shape()
         self.logger.debug(f"has shape ID '{self.shape_id}'")
-        self._write_attribute('shapeId', self.shape_id)
-        self._write_attribute('materialIds', self.i3d.shapes[self.shape_id].material_indexes)
+        # Instances of the same mesh share their shape, so its attribute strings are reused instead of rebuilt per node
+        shape = self.i3d.shapes[self.shape_id]
+        set_attribute = self.element.set
+        set_attribute('shapeId', shape.shape_id_string)
+        set_attribute('materialIds', shape.material_indexes)
         super().populate_xml_element()
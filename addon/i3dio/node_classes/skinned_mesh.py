@@ -10,20 +10,22 @@ import bpy
 
 from . import node
 from .node import (TransformGroupNode, SceneGraphNode)
-from .shape import (ShapeNode, EvaluatedMesh)
+from .shape import ShapeNode
 from ..i3d import I3D
 from .. import xml_i3d
 
 
 class SkinnedMeshBoneNode(TransformGroupNode):
+    __slots__ = ()
+
     def __init__(self, id_: int, bone_object: bpy.types.Bone,
                  i3d: I3D, parent: SceneGraphNode):
         super().__init__(id_=id_, empty_object=bone_object, i3d=i3d, parent=parent)
 
     @property
     def _transform_for_conversion(self) -> mathutils.Matrix:
-
-        if self.blender_object.parent is None:
+        parent_bone = self.blender_object.parent
+        if parent_bone is None:
             # The bone is parented to the armature directly, and therefor should just use the matrix_local which is in
             # relation to the armature anyway.
             bone_transform = self.blender_object.matrix_local
@@ -31,14 +33,16 @@ class SkinnedMeshBoneNode(TransformGroupNode):
             # To find the transform of the bone, we take the inverse of its parents transform in armature space and
             # multiply that with the bones transform in armature space. The new 4x4 matrix gives the position and
             # rotation in relation to the parent bone (of the head, that is)
-            bone_transform = self.blender_object.parent.matrix_local.inverted() @ self.blender_object.matrix_local
+            bone_transform = parent_bone.matrix_local.inverted() @ self.blender_object.matrix_local
 
-        conversion_matrix = self.i3d.conversion_matrix @ bone_transform @ self.i3d.conversion_matrix.inverted()
+        conversion_matrix = self.i3d.conversion_matrix @ bone_transform @ self.i3d.conversion_matrix_inverted
 
         return conversion_matrix
 
 
 class SkinnedMeshRootNode(TransformGroupNode):
+    __slots__ = ('bones', 'bone_mapping', 'is_located')
+
     def __init__(self, id_: int, armature_object: bpy.types.Armature,
                  i3d: I3D, parent: Union[SceneGraphNode, None] = None):
         # The skinBindID essentially, but mapped with the bone names for easy reference. An ordered dict is important
@@ -61,13 +65,17 @@ class SkinnedMeshRootNode(TransformGroupNode):
             super().add_i3d_mapping_to_xml()
 
     def _add_bone(self, bone_object: bpy.types.Bone, parent: Union[SkinnedMeshBoneNode, SkinnedMeshRootNode]):
-        """Recursive function for adding a bone along with all of its children"""
-        self.bones.append(self.i3d.add_bone(bone_object, parent))
-        current_bone = self.bones[-1]
-        self.bone_mapping[bone_object.name] = current_bone.id
-
-        for child_bone in bone_object.children:
-            self._add_bone(child_bone, current_bone)
+        """Adds a bone along with all of its children, depth first. An explicit stack is used instead of recursion, so
+        deep bone chains can't exceed the recursion limit"""
+        bones_to_add = [(bone_object, parent)]
+        while bones_to_add:
+            bone_object, parent = bones_to_add.pop()
+            self.bones.append(self.i3d.add_bone(bone_object, parent))
+            current_bone = self.bones[-1]
+            self.bone_mapping[bone_object.name] = current_bone.id
+
+            # Reversed, so the children are popped in their original order
+            bones_to_add.extend((child_bone, current_bone) for child_bone in reversed(bone_object.children[:]))
 
     def update_bone_parent(self, parent):
         for bone in self.bones:
@@ -83,6 +91,8 @@ class SkinnedMeshRootNode(TransformGroupNode):
 
 
 class SkinnedMeshShapeNode(ShapeNode):
+    __slots__ = ('armature_nodes', 'skinned_mesh_name', 'bone_mapping')
+
     def __init__(self, id_: int, skinned_mesh_object: bpy.types.Object, i3d: I3D,
                  parent: [SceneGraphNode or None] = None):
         self.armature_nodes = []
@@ -96,8 +106,7 @@ class SkinnedMeshShapeNode(ShapeNode):
     def add_shape(self):
         # Use a ChainMap to easily combine multiple bone mappings and get around any problems with multiple bones
         # named the same as a ChainMap just gets the bone from the first armature added
-        self.shape_id = self.i3d.add_shape(EvaluatedMesh(self.i3d, self.blender_object), self.skinned_mesh_name,
-                                           bone_mapping=self.bone_mapping)
+        self.shape_id = self.i3d.add_shape(self.blender_object, self.skinned_mesh_name, bone_mapping=self.bone_mapping)
         self.xml_elements['IndexedTriangleSet'] = self.i3d.shapes[self.shape_id].element
 
     def populate_xml_element(self):
@@ -21,7 +21,7 @@ def xml_library_callback(scene, context):
 
 
 def xml_library_changed(self, context):
-    xml_i3d.xml_current_library = self.xml_library
+    xml_i3d.set_xml_library(self.xml_library)
 
 
 class I3D_IO_AddonPreferences(AddonPreferences):
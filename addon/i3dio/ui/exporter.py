@@ -25,12 +25,12 @@ from .. import (
 classes = []
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3DExportUIProperties(bpy.types.PropertyGroup):
     selection: EnumProperty(
         name="Export",
@@ -160,7 +160,7 @@ class I3DExportUIProperties(bpy.types.PropertyGroup):
     )
 
 
-@register
+@_register_class
 @orientation_helper(axis_forward='-Z', axis_up='Y')
 class I3D_IO_OT_export(Operator, ExportHelper):
     """Save i3d file"""
@@ -202,7 +202,7 @@ def menu_func_export(self, context):
     self.layout.operator(I3D_IO_OT_export.bl_idname, text="I3D (.i3d)")
 
 
-@register
+@_register_class
 class I3D_IO_PT_export_main(Panel):
     bl_space_type = 'FILE_BROWSER'
     bl_region_type = 'TOOL_PROPS'
@@ -225,7 +225,7 @@ class I3D_IO_PT_export_main(Panel):
         layout.prop(bpy.context.scene.i3dio, 'selection')
 
 
-@register
+@_register_class
 class I3D_IO_PT_export_options(Panel):
     bl_space_type = 'FILE_BROWSER'
     bl_region_type = 'TOOL_PROPS'
@@ -275,7 +275,7 @@ class I3D_IO_PT_export_options(Panel):
         layout.prop(operator, "axis_up")
 
 
-@register
+@_register_class
 class I3D_IO_PT_export_files(Panel):
     bl_space_type = 'FILE_BROWSER'
     bl_region_type = 'TOOL_PROPS'
@@ -310,7 +310,7 @@ class I3D_IO_PT_export_files(Panel):
         column.props_enum(bpy.context.scene.i3dio, 'i3d_mapping_overwrite_mode')
 
 
-@register
+@_register_class
 class I3D_IO_PT_export_debug(Panel):
     bl_space_type = 'FILE_BROWSER'
     bl_region_type = 'TOOL_PROPS'
@@ -331,7 +331,7 @@ class I3D_IO_PT_export_debug(Panel):
         layout.prop(bpy.context.scene.i3dio, 'log_to_file')
 
 
-@register
+@_register_class
 class I3D_IO_PT_i3d_mapping_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -347,13 +347,14 @@ class I3D_IO_PT_i3d_mapping_attributes(Panel):
         layout.prop(bpy.context.scene.i3dio, 'i3d_mapping_file_path')
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
     bpy.types.Scene.i3dio = PointerProperty(type=I3DExportUIProperties)
 
 
 def unregister():
     del bpy.types.Scene.i3dio
-    for cls in reversed(classes):
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
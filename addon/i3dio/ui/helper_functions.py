@@ -8,7 +8,7 @@ import bpy
 classes = []
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
@@ -92,11 +92,12 @@ def i3d_property(layout, attributes, attribute: str, obj):
         attrib_row.prop(attributes, attribute)
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
 
 
 def unregister():
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
\ No newline at end of file
+    _unregister_classes()
\ No newline at end of file
@@ -18,12 +18,12 @@ from ..xml_i3d import i3d_max
 classes = []
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3DNodeLightAttributes(bpy.types.PropertyGroup):
     i3d_map = {
         'type_of_light': {'name': 'type',
@@ -317,7 +317,7 @@ class I3DNodeLightAttributes(bpy.types.PropertyGroup):
     )
 
 
-@register
+@_register_class
 class I3D_IO_PT_light_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -361,13 +361,14 @@ class I3D_IO_PT_light_attributes(Panel):
         i3d_property(layout, obj.i3d_attributes, "split_distance_4", obj)
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
     bpy.types.Light.i3d_attributes = PointerProperty(type=I3DNodeLightAttributes)
 
 
 def unregister():
     del bpy.types.Light.i3d_attributes
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
@@ -16,12 +16,12 @@ from bpy.props import (
 classes = []
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3DNodeShapeAttributes(bpy.types.PropertyGroup):
     i3d_map = {
         'casts_shadows': {'name': 'castsShadows', 'default': False},
@@ -84,7 +84,7 @@ class I3DNodeShapeAttributes(bpy.types.PropertyGroup):
     )
 
 
-@register
+@_register_class
 class I3D_IO_PT_shape_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -111,13 +111,14 @@ class I3D_IO_PT_shape_attributes(Panel):
         layout.prop(obj.i3d_attributes, 'fill_volume')
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
     bpy.types.Mesh.i3d_attributes = PointerProperty(type=I3DNodeShapeAttributes)
 
 
 def unregister():
     del bpy.types.Mesh.i3d_attributes
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
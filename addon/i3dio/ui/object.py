@@ -16,12 +16,12 @@ from bpy.props import (
 classes = []
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3DNodeObjectAttributes(bpy.types.PropertyGroup):
     i3d_map = {
         'visibility': {'name': 'visibility', 'default': True},
@@ -101,7 +101,7 @@ class I3DNodeObjectAttributes(bpy.types.PropertyGroup):
     )
 
 
-@register
+@_register_class
 class I3D_IO_PT_object_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -123,7 +123,7 @@ class I3D_IO_PT_object_attributes(Panel):
         layout.prop(obj.i3d_attributes, 'min_clip_distance')
 
 
-@register
+@_register_class
 class I3D_IO_PT_rigid_body_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -168,7 +168,7 @@ class I3D_IO_PT_rigid_body_attributes(Panel):
             obj.i3d_attributes.property_unset('trigger')
 
 
-@register
+@_register_class
 class I3DMergeGroupObjectData(bpy.types.PropertyGroup):
     is_root: BoolProperty(
         name="Root of merge group",
@@ -182,7 +182,7 @@ class I3DMergeGroupObjectData(bpy.types.PropertyGroup):
                              )
 
 
-@register
+@_register_class
 class I3D_IO_PT_merge_group_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -209,7 +209,7 @@ class I3D_IO_PT_merge_group_attributes(Panel):
         row.prop(obj.i3d_merge_group, 'group_id')
 
 
-@register
+@_register_class
 class I3DMappingData(bpy.types.PropertyGroup):
     is_mapped: BoolProperty(
         name="Add to mapping",
@@ -224,7 +224,7 @@ class I3DMappingData(bpy.types.PropertyGroup):
     )
 
 
-@register
+@_register_class
 class I3D_IO_PT_mapping_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -248,9 +248,11 @@ class I3D_IO_PT_mapping_attributes(Panel):
         row.prop(obj.i3d_mapping, 'mapping_name')
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
     bpy.types.Object.i3d_attributes = PointerProperty(type=I3DNodeObjectAttributes)
     bpy.types.Object.i3d_merge_group = PointerProperty(type=I3DMergeGroupObjectData)
     bpy.types.Object.i3d_mapping = PointerProperty(type=I3DMappingData)
@@ -261,5 +263,4 @@ def unregister():
     del bpy.types.Object.i3d_merge_group
     del bpy.types.Object.i3d_attributes
 
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
@@ -17,14 +17,19 @@ classes = []
 shader_unselected_default_text = ''
 shader_no_variation = 'None'
 shader_parameter_max_decimals = 3  # 0-6 per blender properties documentation
+# The property of a shader parameter that holds its data, by the type of the parameter
+shader_parameter_data_properties = {'float': 'data_float_1',
+                                    'float2': 'data_float_2',
+                                    'float3': 'data_float_3',
+                                    'float4': 'data_float_4'}
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3DShaderParameter(bpy.types.PropertyGroup):
     name: StringProperty(default='Unnamed Attribute')
     type: EnumProperty(items=[('float', '', ''), ('float2', '', ''), ('float3', '', ''), ('float4', '', '')])
@@ -34,7 +39,7 @@ class I3DShaderParameter(bpy.types.PropertyGroup):
     data_float_4: FloatVectorProperty(size=4, precision=shader_parameter_max_decimals)
 
 
-@register
+@_register_class
 class I3DShaderTexture(bpy.types.PropertyGroup):
     name: StringProperty(default='Unnamed Texture')
     source: StringProperty(name='Texture source',
@@ -45,7 +50,7 @@ class I3DShaderTexture(bpy.types.PropertyGroup):
     default_source: StringProperty()
 
 
-@register
+@_register_class
 class I3DShaderVariation(bpy.types.PropertyGroup):
     name: StringProperty(default='Error')
 
@@ -59,7 +64,7 @@ def clear_shader(context):
     attributes.variation = shader_no_variation
 
 
-@register
+@_register_class
 class I3DLoadCustomShader(bpy.types.Operator):
     """Can load in and generate a custom class for a shader, so settings can be set for export"""
     bl_idname = 'i3dio.load_custom_shader'
@@ -136,7 +141,7 @@ def texture_element_as_dict(texture):
     return texture_dictionary
 
 
-@register
+@_register_class
 class I3DLoadCustomShaderVariation(bpy.types.Operator):
     """This function can load the parameters for a given shader variation, assumes that the source is valid,
        such that this operation will never fail"""
@@ -191,14 +196,9 @@ class I3DLoadCustomShaderVariation(bpy.types.Operator):
                         param.name = parameter['name']
                         param.type = parameter['type']
                         data = tuple(map(float, parameter['default_value']))
-                        if param.type == 'float':
-                            param.data_float_1 = data[0]
-                        elif param.type == 'float2':
-                            param.data_float_2 = data
-                        elif param.type == 'float3':
-                            param.data_float_3 = data
-                        elif param.type == 'float4':
-                            param.data_float_4 = data
+                        data_property = shader_parameter_data_properties.get(param.type)
+                        if data_property is not None:
+                            setattr(param, data_property, data[0] if param.type == 'float' else data)
 
                 texture_group = grouped_textures.get(group)
                 if texture_group is not None:
@@ -211,7 +211,7 @@ class I3DLoadCustomShaderVariation(bpy.types.Operator):
         return {'FINISHED'}
 
 
-@register
+@_register_class
 class I3DMaterialShader(bpy.types.PropertyGroup):
 
     def source_setter(self, value):
@@ -268,7 +268,7 @@ class I3DMaterialShader(bpy.types.PropertyGroup):
     shader_textures: CollectionProperty(type=I3DShaderTexture)
 
 
-@register
+@_register_class
 class I3D_IO_PT_shader(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -290,7 +290,7 @@ class I3D_IO_PT_shader(Panel):
             layout.prop(material.i3d_attributes, 'variation')
 
 
-@register
+@_register_class
 class I3D_IO_PT_shader_parameters(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -313,19 +313,11 @@ class I3D_IO_PT_shader_parameters(Panel):
         column = layout.column(align=True)
         parameters = bpy.context.active_object.active_material.i3d_attributes.shader_parameters
         for parameter in parameters:
-            if parameter.type == 'float':
-                property_type = 'data_float_1'
-            elif parameter.type == 'float2':
-                property_type = 'data_float_2'
-            elif parameter.type == 'float3':
-                property_type = 'data_float_3'
-            else:
-                property_type = 'data_float_4'
-
+            property_type = shader_parameter_data_properties.get(parameter.type, 'data_float_4')
             column.row(align=True).prop(parameter, property_type, text=parameter.name)
 
 
-@register
+@_register_class
 class I3D_IO_PT_shader_textures(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -351,14 +343,15 @@ class I3D_IO_PT_shader_textures(Panel):
         return is_active
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
     bpy.types.Material.i3d_attributes = PointerProperty(type=I3DMaterialShader)
 
 
 def unregister():
-    for cls in reversed(classes):
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
     del bpy.types.Material.i3d_attributes
 
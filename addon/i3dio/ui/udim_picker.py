@@ -104,12 +104,12 @@ def generate_udim_previews():
         preview_collection.udim_previews.append((filename, name, name, thumbnail.icon_id, i))
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3D_IO_OT_udim_mover(Operator):
     bl_idname = 'i3dio.udim_mover'
     bl_label = "Move UV's"
@@ -203,7 +203,7 @@ class I3D_IO_OT_udim_mover(Operator):
                     self.parse_island(bm, face, faces_left, island, faces_to_verts, verts_to_faces)
 
 
-@register
+@_register_class
 class I3D_IO_OT_udim_picker_move_relative(Operator):
     bl_idname = 'i3dio.udim_picker_move_relative'
     bl_label = ""
@@ -274,7 +274,7 @@ class I3D_IO_OT_udim_picker_move_relative(Operator):
         return context.window_manager.invoke_props_dialog(self)
 
 
-@register
+@_register_class
 class I3D_IO_OT_udim_picker_grid_order(Operator):
     bl_idname = 'i3dio.udim_picker_grid_order'
     bl_label = ""
@@ -300,7 +300,7 @@ class I3D_IO_OT_udim_picker_grid_order(Operator):
         return context.window_manager.invoke_props_dialog(self, width=800)
 
 
-@register
+@_register_class
 class I3D_IO_OT_udim_setup(Operator):
     bl_idname = 'i3dio.udim_setup'
     bl_label = "Setup UV Editor"
@@ -312,7 +312,7 @@ class I3D_IO_OT_udim_setup(Operator):
         return {'FINISHED'}
 
 
-@register
+@_register_class
 class I3D_IO_MT_PIE_UDIM_picker(Menu):
     bl_idname = 'I3D_IO_MT_PIE_UDIM_picker'
     bl_label = 'UDIM Picker'
@@ -370,6 +370,9 @@ def udim_selected(self, context):
     bpy.ops.i3dio.udim_mover(uv_offset=uv_offset, relative_move=False)
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
     import bpy.utils.previews
     preview_collection = bpy.utils.previews.new()
@@ -378,8 +381,7 @@ def register():
 
     generate_udim_previews()
 
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
 
     WindowManager.udim_previews = EnumProperty(items=preview_collection.udim_previews, update=udim_selected)
 
@@ -388,8 +390,7 @@ def register():
 
 def unregister():
     remove_hotkey()
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
+    _unregister_classes()
 
     for preview_collection in preview_collections.values():
         bpy.utils.previews.remove(preview_collection)
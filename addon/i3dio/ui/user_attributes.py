@@ -20,12 +20,12 @@ attribute_default_name = 'Attribute'
 classes = []
 
 
-def register(cls):
+def _register_class(cls):
     classes.append(cls)
     return cls
 
 
-@register
+@_register_class
 class I3DUserAttributeItem(bpy.types.PropertyGroup):
 
     def name_update(self, context):
@@ -65,13 +65,13 @@ class I3DUserAttributeItem(bpy.types.PropertyGroup):
     data_scriptCallback: StringProperty(default='')
 
 
-@register
+@_register_class
 class I3DUserAttributes(bpy.types.PropertyGroup):
     attribute_list: CollectionProperty(type=I3DUserAttributeItem)
     active_attribute: IntProperty(name="User attribute index", default=0)
 
 
-@register
+@_register_class
 class I3D_IO_UL_user_attributes(bpy.types.UIList):
     """UIList for i3d user attributes"""
 
@@ -87,7 +87,7 @@ class I3D_IO_UL_user_attributes(bpy.types.UIList):
             layout.label(text="", icon=custom_icon)
 
 
-@register
+@_register_class
 class I3D_IO_OT_new_user_attribute(Operator):
     """Add a new user attribute to the list"""
 
@@ -101,7 +101,7 @@ class I3D_IO_OT_new_user_attribute(Operator):
         return {'FINISHED'}
 
 
-@register
+@_register_class
 class I3D_IO_OT_delete_user_attribute(Operator):
     """Delete the selected user attribute"""
 
@@ -122,7 +122,7 @@ class I3D_IO_OT_delete_user_attribute(Operator):
         return{'FINISHED'}
 
 
-@register
+@_register_class
 class I3D_IO_PT_user_attributes(Panel):
     bl_space_type = 'PROPERTIES'
     bl_region_type = 'WINDOW'
@@ -156,14 +156,15 @@ class I3D_IO_PT_user_attributes(Panel):
             row.prop(active_attribute, active_attribute.type, text='')
 
 
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(tuple(classes))
+
+
 def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
+    _register_classes()
     bpy.types.Object.i3d_user_attributes = PointerProperty(type=I3DUserAttributes)
 
 
 def unregister():
     del bpy.types.Object.i3d_user_attributes
 
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
\ No newline at end of file
+    _unregister_classes()
\ No newline at end of file
@@ -2,12 +2,14 @@
 This module contains various small utility functions, that don't really belong anywhere else
 """
 from __future__ import annotations
-from typing import Union, List
+from typing import Union, List, Dict
 import logging
 import math
 import mathutils
 import bpy
 import os
+import functools
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +43,53 @@ def vector_compare(a: mathutils.Vector, b: mathutils.Vector, epsilon: float = 0.
     return True
 
 
+@functools.lru_cache(maxsize=None)
+def _normalized_fs_data_path(fs_data_path: str, blend_file_path: str) -> str:
+    """The FS data path is the same for every file in an export, so it only has to be cleaned up once. The path of the
+    blend file is part of the key, since a blender relative data path depends on it"""
+    return os.path.normpath(bpy.path.abspath(fs_data_path))
+
+
+def decompose_transforms(matrices: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+    """Decomposes a stack of 4x4 transformation matrices into translations, 'XYZ' euler rotations in radians and scales
+
+    This does the same as calling `to_translation`, `to_euler('XYZ')`, `to_scale` and `is_negative` on every single
+    mathutils.Matrix, but for all of the matrices at once. The euler extraction follows the one used by blender, so both
+    the choice between the two possible solutions and the handling of gimbal lock are the same.
+
+    Args:
+        matrices: Array of shape (N, 4, 4) with the matrices in row-major order
+
+    Returns:
+        Arrays of shape (N, 3) with the translations, rotations and scales and an array of shape (N,) which is True for
+        the matrices with a negative determinant
+    """
+    translations = matrices[:, :3, 3]
+    rotation_scale = matrices[:, :3, :3]
+    # The scale is the length of each axis, which are the columns of the matrix
+    scales = np.linalg.norm(rotation_scale, axis=1)
+    is_negative = np.linalg.det(rotation_scale) < 0
+
+    # Axes with a length of zero are left as they are, just like normalizing a zero vector does in mathutils
+    m = np.divide(rotation_scale, scales[:, np.newaxis, :], out=np.zeros_like(rotation_scale),
+                  where=scales[:, np.newaxis, :] != 0)
+    cy = np.hypot(m[:, 0, 0], m[:, 1, 0])
+    gimbal_locked = cy <= 16 * np.finfo(np.float32).eps
+    rotations = np.stack((np.where(gimbal_locked,
+                                   np.arctan2(-m[:, 1, 2], m[:, 1, 1]),
+                                   np.arctan2(m[:, 2, 1], m[:, 2, 2])),
+                          np.arctan2(-m[:, 2, 0], cy),
+                          np.where(gimbal_locked, 0.0, np.arctan2(m[:, 1, 0], m[:, 0, 0]))), axis=1)
+    alternative_rotations = np.stack((np.arctan2(-m[:, 2, 1], -m[:, 2, 2]),
+                                      np.arctan2(-m[:, 2, 0], -cy),
+                                      np.arctan2(-m[:, 1, 0], -m[:, 0, 0])), axis=1)
+    # Of the two possible solutions, the one with the smallest rotations is used
+    use_alternative = ~gimbal_locked & (np.abs(rotations).sum(axis=1) > np.abs(alternative_rotations).sum(axis=1))
+    rotations = np.where(use_alternative[:, np.newaxis], alternative_rotations, rotations)
+
+    return translations, rotations, scales, is_negative
+
+
 def as_fs_relative_path(filepath: str):
     """Checks if a filepath is relative to the FS data directory
 
@@ -63,9 +112,8 @@ def as_fs_relative_path(filepath: str):
     logger.debug(f"Original filepath: {filepath}")
     filepath_clean = os.path.normpath(bpy.path.abspath(filepath))  # normpath cleans up stuff such as '../'
     logger.debug(f"Cleaned filepath: {filepath_clean}")
-    fs_data_path = os.path.normpath(
-                        bpy.path.abspath(
-                            bpy.context.preferences.addons[__package__].preferences.fs_data_path))
+    fs_data_path = _normalized_fs_data_path(bpy.context.preferences.addons[__package__].preferences.fs_data_path,
+                                            bpy.data.filepath)
     logger.debug(f"FS data path: {fs_data_path}")
     try:
         if fs_data_path != '':
@@ -82,3 +130,25 @@ def sort_blender_objects_by_name(objects: List[BlenderObject]) -> List[BlenderOb
     sorted_objects = list(objects)  # Create new list from whatever comes in, whether it is an existing list or a tuple
     sorted_objects.sort(key=lambda x: x.name)  # Sort by name
     return sorted_objects
+
+
+def map_object_children(objects: List[bpy.types.Object]) -> Dict[bpy.types.Object, List[bpy.types.Object]]:
+    """Maps every object to its children, sorted by name
+
+    `Object.children <https://docs.blender.org/api/current/bpy.types.Object.html#bpy.types.Object.children>`_
+    searches through every object in the blend file each time it is accessed, which makes walking a hierarchy through it
+    scale quadratically with the amount of objects. Building the map in a single pass avoids that.
+
+    Args:
+        objects: All of the objects which could be children, such as bpy.data.objects
+
+    Returns:
+        A dictionary from an object to a name sorted list of its children. Objects without children are not included
+    """
+    children = {}
+    for obj in objects:
+        if obj.parent is not None:
+            children.setdefault(obj.parent, []).append(obj)
+    for siblings in children.values():
+        siblings.sort(key=lambda x: x.name)
+    return children
@@ -1,9 +1,10 @@
 """This module contains functionality for handling the i3d xml format such as reading and writing with correct
 precision """
 from __future__ import annotations  # Enables python 4.0 annotation typehints fx. class self-referencing
-from typing import (Union, Dict)
+from typing import (Union, Dict, Iterable)
 import math
 import logging
+import numpy as np
 import bpy
 import mathutils
 
@@ -34,22 +35,24 @@ skinned_mesh_prefix = 'SkinnedMesh_'
 i3d_max = 3.40282e+38
 
 
-def _generic_library_switcher(function: str, *argv, **kwargs):
+def set_xml_library(library: str) -> None:
     """
-    Very generic way of calling functions that have the same signature between the two libraries
+    Switches the library that is used for creating and writing xml. Element, SubElement and ElementTree are bound
+    directly to the ones of the library, since the two libraries share their signatures. So creating elements doesn't
+    go through any extra python calls.
 
     Args:
-        function:
-        *argv:
-        **kwargs:
+        library: Either 'lxml' or 'element_tree'
+    """
+    global xml_current_library, Element, SubElement, ElementTree
+    xml_current_library = library
+    library_module = etree if library == 'lxml' else ET
+    Element = library_module.Element
+    SubElement = library_module.SubElement
+    ElementTree = library_module.ElementTree
 
-    Returns:
 
-    """
-    if xml_current_library == 'lxml':
-        return getattr(etree, function)(*argv, **kwargs)
-    else:
-        return getattr(ET, function)(*argv, **kwargs)
+set_xml_library(xml_current_library)
 
 
 class CommentedTreeBuilder(ET.TreeBuilder):
@@ -70,34 +73,94 @@ def parse(*argv, **kwargs):
         else:
             tree = ET.parse(*argv, **kwargs, parser=ET.XMLParser(target=CommentedTreeBuilder()))
     except tuple(xml_parsing_exceptions) as e:
-        print(f"Error while parsing xml file: {e}")
+        logger.error(f"Error while parsing xml file: {e}")
     return tree
 
 
-def SubElement(*argv, **kwargs):
-    return _generic_library_switcher('SubElement', *argv, **kwargs)
-
-
-def Element(*argv, **kwargs):
-    return _generic_library_switcher('Element', *argv, **kwargs)
-
-
-def ElementTree(*argv, **kwargs):
-    return _generic_library_switcher('ElementTree', *argv, **kwargs)
-
-
 def write_tree_to_file(tree, file_path: str, *argv, **kwargs):
     if xml_current_library == 'lxml':
-        f = open(file_path, 'w')
-        i3d_string = etree.tostring(tree, *argv, pretty_print=True, **kwargs).decode(kwargs['encoding'])
-        i3d_string = i3d_string.replace("&gt;", ">")
-        f.write(i3d_string)
-        f.close()
+        # Serialize straight to the encoded bytes and write those, instead of decoding the entire document to a string
+        # and having it encoded again by the file object. This also ensures that the file actually uses the encoding
+        # that is stated in the xml declaration, rather than the platform default.
+        i3d_bytes = etree.tostring(tree, *argv, pretty_print=True, **kwargs)
+        with open(file_path, 'wb') as f:
+            f.write(i3d_bytes.replace(b"&gt;", b">"))
     else:
         add_indentations(tree.getroot())
         tree.write(file_path, *argv, **kwargs)
 
 
+class _UnescapedAttributeWriter:
+    """Wraps a binary file for the incremental lxml writer, to turn the escaped '>' in attributes back into a literal
+    '>' as the i3d format expects. An escape sequence can be split between two writes, so a trailing part of one is
+    held back until the next write"""
+    def __init__(self, file):
+        self.file = file
+        self.held_back = b''
+
+    def write(self, data: bytes) -> None:
+        data = self.held_back + data
+        partial_start = data.rfind(b'&', max(len(data) - 3, 0))
+        if partial_start != -1 and b'&gt;'.startswith(data[partial_start:]):
+            data, self.held_back = data[:partial_start], data[partial_start:]
+        else:
+            self.held_back = b''
+        self.file.write(data.replace(b"&gt;", b">"))
+
+    def flush(self) -> None:
+        self.file.write(self.held_back)
+        self.held_back = b''
+
+
+def _stream_section(xf, section: XML_Element, elements: Iterable[XML_Element]) -> None:
+    elements = iter(elements)
+    element = next(elements, None)
+    if element is None:
+        # An empty section is written in one go, so it ends up as a self-closing tag
+        section.tail = None
+        xf.write(section)
+        return
+
+    with xf.element(section.tag, dict(section.attrib)):
+        while element is not None:
+            section.remove(element)
+            add_indentations(element, 2)
+            element.tail = None
+            xf.write('\n    ')
+            xf.write(element)
+            # Free the element right away, since it has been written
+            element.clear()
+            element = next(elements, None)
+        xf.write('\n  ')
+
+
+def stream_to_i3d_file(root: XML_Element, file_path: str, streamed_sections: Dict[str, Iterable[XML_Element]]) -> None:
+    """Writes the i3d file incrementally with lxml. Every section is written one element at a time and each element is
+    freed as soon as it is written. The elements of the streamed sections are supplied one at a time as well, so the
+    biggest sections never have to be fully built in memory at once.
+
+    Args:
+        root: The i3d root element, which is consumed by the writing
+        file_path: The path to write the i3d file to
+        streamed_sections: The elements to stream into the sections of the root, by the tag of the section. They
+            must be children of the section once they are supplied. All other sections are written with the children
+            they already have
+    """
+    with open(file_path, 'wb') as f:
+        writer = _UnescapedAttributeWriter(f)
+        with etree.xmlfile(writer, encoding='iso-8859-1') as xf:
+            xf.write_declaration()
+            with xf.element(root.tag, dict(root.attrib), nsmap=root.nsmap):
+                for section in list(root):
+                    # Detach the section, since lxml would otherwise declare the namespaces of the root on it again
+                    root.remove(section)
+                    xf.write('\n  ')
+                    _stream_section(xf, section, streamed_sections.get(section.tag, list(section)))
+                xf.write('\n')
+        writer.write(b'\n')
+        writer.flush()
+
+
 def export_to_i3d_file(source: XML_Element, file_path: str, *argv, **kwargs):
     settings = {
         'xml_declaration': True,
@@ -142,7 +205,7 @@ def write_float(element: XML_Element, attribute: str, value: float) -> None:
 
 def write_bool(element: XML_Element, attribute: str, value: bool) -> None:
     """Write the attribute into the element with formatting for booleans"""
-    element.set(attribute, f"{value!s}".lower())
+    element.set(attribute, 'true' if value else 'false')
 
 
 def write_string(element: XML_Element, attribute: str, value: str) -> None:
@@ -151,7 +214,20 @@ def write_string(element: XML_Element, attribute: str, value: str) -> None:
 
 
 def write_vector(element: XML_Element, attribute: str, values: tuple) -> None:
-    element.set(attribute, "{0:.6g} {1:.6g} {2:.6g}".format(*values))
+    element.set(attribute, "%.6g %.6g %.6g" % values[:3])
+
+
+def format_vectors(vectors: np.ndarray, value_format: str = '%.6f') -> np.ndarray:
+    """Formats each row of a 2D array as a space separated string, by default as floats with a precision of 6
+
+    The float to string conversion is done for an entire column at a time, which is a lot faster than formatting every
+    single vector with a separate python call, when dealing with the amount of vertices in a mesh.
+    """
+    columns = [np.char.mod(value_format, vectors[:, idx]) for idx in range(vectors.shape[1])]
+    formatted = columns[0]
+    for column in columns[1:]:
+        formatted = np.char.add(np.char.add(formatted, ' '), column)
+    return formatted
 
 
 def write_attribute(element: XML_Element, attribute: str, value) -> None:
@@ -169,33 +245,61 @@ def write_attribute(element: XML_Element, attribute: str, value) -> None:
         logger.warning(f"No xml attribute writing function for attribute of type '{type(value)}'")
 
 
-# TODO: Clean up this very generic, but spaghetti ish implementation of i3d attributes
+# Schema of the exported properties for every propertygroup class, so the annotations and the i3d_map only have to be
+# inspected the first time a class is seen and not again for every single node in the scene
+_property_schemas: Dict[type, list] = {}
+
+
+def _property_schema(property_group) -> list:
+    """Returns a tuple per exported property of the propertygroup with everything from the i3d_map that is needed to
+    write it, in the order the properties are declared"""
+    schema = _property_schemas.get(type(property_group))
+    if schema is None:
+        i3d_map = property_group.i3d_map
+        schema = []
+        # Since blender properties are basically abusing the annotation system, we can also abuse this to create
+        # a generic property export function by accessing the annotation dictionary
+        for prop_key in property_group.__annotations__.keys():
+            # If the attribute isn't in the i3d_map, then it isn't supposed to be exported as an attribute
+            if prop_key not in i3d_map:
+                continue
+            prop_map = i3d_map[prop_key]
+            # Resolve the tracking information of the dependencies up front, since it is static per class
+            dependants = tuple((dependant['name'], dependant['value'],
+                                i3d_map[dependant['name']].get('tracking', False))
+                               for dependant in prop_map.get('depends', []))
+            schema.append((prop_key,
+                           prop_key + '_tracking',
+                           prop_map.get('name'),
+                           prop_map.get('default'),
+                           prop_map.get('type'),
+                           prop_map.get('placement', 'Node'),
+                           dependants,
+                           prop_map.get('tracking'),
+                           prop_map.get('override')))
+        _property_schemas[type(property_group)] = schema
+    return schema
+
+
 def write_i3d_properties(obj, property_group, elements: Dict[str, Union[XML_Element, None]]) -> None:
     logger.info(f"Writing non-default properties from propertygroup: '{type(property_group).__name__}'")
-    # Since blender properties are basically abusing the annotation system, we can also abuse this to create
-    # a generic property export function by accessing the annotation dictionary
     properties_written = 0
-    for prop_key in property_group.__annotations__.keys():
-        # If the attribute isn't in the i3d_map, then it isn't supposed to be exported as an attribute
-        if prop_key not in property_group.i3d_map:
-            continue
-
+    for (prop_key, tracking_key, i3d_name, default, field_type, i3d_placement,
+         dependants, member_to_track, override) in _property_schema(property_group):
         prop_name = prop_key
         value = getattr(property_group, prop_key)
 
         # Dependency Checks
 
         # If the value depends on some other value being something specific
-        dependants = property_group.i3d_map[prop_key].get('depends', [])
         dependency_break = False
-        for dependant in dependants:
+        for dependant_name, dependant_value, member_depends_tracking in dependants:
             # Pre-initialize to non-tracked version
-            member_value = getattr(property_group, dependant['name'])
+            member_value = getattr(property_group, dependant_name)
             # If the dependant value has a parameter that it is tracking
-            member_depends_tracking = property_group.i3d_map[dependant['name']].get('tracking', False)
             if member_depends_tracking:
                 # If we are currently using the tracked value
-                if getattr(property_group, dependant['name'] + '_tracking'):
+                if getattr(property_group, dependant_name + '_tracking'):
                     # Get the value of the tracked member
                     member_value = getattr(obj, member_depends_tracking['member_path'])
                     # If there exist a map to map from tracked to i3d, then convert
@@ -203,7 +307,7 @@ def write_i3d_properties(obj, property_group, elements: Dict[str, Union[XML_Elem
                         member_value = member_depends_tracking['mapping'][member_value]
 
             # If the dependant member does not equal the correct value
-            if member_value != dependant['value']:
+            if member_value != dependant_value:
                 # One of the dependencies were broke, so skip searching through the rest.
                 dependency_break = True
                 break
@@ -213,9 +317,8 @@ def write_i3d_properties(obj, property_group, elements: Dict[str, Union[XML_Elem
             continue
 
         # Tracking checks
-        tracking = getattr(property_group, prop_key + '_tracking', None)
+        tracking = getattr(property_group, tracking_key, None)
         if tracking:
-            member_to_track = property_group.i3d_map[prop_key].get('tracking')
             if 'value' in member_to_track:
                 if getattr(obj, member_to_track['member_path']) != member_to_track['value']:
                     continue
@@ -226,10 +329,6 @@ def write_i3d_properties(obj, property_group, elements: Dict[str, Union[XML_Elem
                 value = getattr(obj, member_to_track['member_path'])
 
         value_to_write = value
-        default = property_group.i3d_map[prop_key].get('default')
-        i3d_name = property_group.i3d_map[prop_key].get('name')
-        field_type = property_group.i3d_map[prop_key].get('type')
-        i3d_placement = property_group.i3d_map[prop_key].get('placement', 'Node')
 
         # Conversion Checks
 
@@ -265,13 +364,14 @@ def write_i3d_properties(obj, property_group, elements: Dict[str, Union[XML_Elem
                                        f" It should be within range [0, ffffffff] (32-bit unsigned)")
                         continue
             elif field_type == 'OVERRIDE':
-                value_to_write = property_group.i3d_map[prop_key].get('override')
+                value_to_write = override
             elif field_type == 'ANGLE':
                 value_to_write = math.degrees(value)
                 if math.isclose(value_to_write, default, abs_tol=0.0001):
                     continue
 
-        logger.debug(f"Property '{prop_name}' with value '{value}'. Default is '{default}'")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Property '{prop_name}' with value '{value}'. Default is '{default}'")
 
         write_attribute(elements[i3d_placement], i3d_name, value_to_write)
         properties_written += 1
@@ -279,6 +379,10 @@ def write_i3d_properties(obj, property_group, elements: Dict[str, Union[XML_Elem
     logger.info(f"Wrote '{properties_written}' properties")
 
 
+# The indentation of every level, so the same strings are reused for every element instead of being built per element
+_indentations = tuple('\n' + level * '  ' for level in range(128))
+
+
 def add_indentations(element: XML_Element, level: int = 0) -> None:
     """
     Used for pretty printing the xml since etree does not indent elements and keeps everything in one continues
@@ -290,23 +394,25 @@ def add_indentations(element: XML_Element, level: int = 0) -> None:
 
     The source code from this solution is taken from http://effbot.org/zone/element-lib.htm#prettyprint
 
-    It recursively checks every element and adds a newline + space indents to the element to make it pretty and
-    easily readable. This technically changes the xml, but the giants engine does not seem to mind the linebreaks
-    and spaces, when parsing the i3d file.
+    It checks every element and adds a newline + space indents to the element to make it pretty and easily readable.
+    This technically changes the xml, but the giants engine does not seem to mind the linebreaks and spaces, when
+    parsing the i3d file. The elements are visited with an explicit stack instead of recursion, since the shapes can
+    contain hundreds of thousands of elements.
     """
-    indents = '\n' + level * '  '
-    if len(element):
-        if not element.text or not element.text.strip():
-            element.text = indents + '  '
-        if not element.tail or not element.tail.strip():
-            element.tail = indents
-        for element in element:
-            add_indentations(element, level + 1)
+    elements = [(element, level, None)]
+    while elements:
+        element, level, parent_indents = elements.pop()
+        indents = _indentations[level] if level < len(_indentations) else '\n' + level * '  '
+        if len(element):
+            if not element.text or not element.text.strip():
+                element.text = _indentations[level + 1] if level + 1 < len(_indentations) else indents + '  '
+            elements.append((element[-1], level + 1, indents))
+            elements.extend((child, level + 1, None) for child in element[:-1])
+        elif not level:
+            continue
         if not element.tail or not element.tail.strip():
-            element.tail = indents
-    else:
-        if level and (not element.tail or not element.tail.strip()):
-            element.tail = indents
+            # The last child closes its parent, so its tail is indented to the level of the parent
+            element.tail = indents if parent_indents is None else parent_indents
 
 
 def escape_attrib_element_tree(text):